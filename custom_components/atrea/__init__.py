@@ -1,3 +1,8 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import ClientError
 from homeassistant.const import (
     CONF_IP_ADDRESS,
     CONF_PORT,
@@ -5,12 +10,38 @@ from homeassistant.const import (
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.exceptions import ConfigEntryNotReady
-from pyatrea import Atrea
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import slugify
 
-from .utils import update_listener
-from .const import DOMAIN, LOGGER, MIN_TIME_BETWEEN_SCANS
+from .api import async_get_client, async_get_client_pool
+from .audit import enable_loop_audit
+from .cache import AtreaMetadataCache, is_cache_valid, restore_metadata
+from .coordinator import (
+    AtreaCoordinator,
+    AtreaFirmwareCoordinator,
+    async_get_poll_scheduler,
+)
+from .query import async_build_query_plan
+from .snapshot import AtreaSnapshot
+from .utils import (
+    getSupportedModes,
+    reloadConfiguration,
+    reloadSupportedModes,
+    update_listener,
+)
+from .const import (
+    CONF_MODBUS_PORT,
+    CONF_TRANSPORT,
+    DEFAULT_MODBUS_PORT,
+    DEFAULT_TRANSPORT,
+    DOMAIN,
+    LOGGER,
+    METADATA_REFRESH_INTERVAL,
+    SETUP_PARALLEL_REQUESTS,
+    TRANSPORT_MODBUS,
+)
 
 PLATFORMS = ["binary_sensor", "button", "climate", "sensor", "update"]
 
@@ -33,69 +64,270 @@ async def async_migrate_entry(hass, config_entry: ConfigEntry):
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        data = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if data is not None:
+            data["coordinator"].async_unregister()
+        await async_get_client_pool(hass).async_release_client(
+            entry.data.get(CONF_IP_ADDRESS), entry.data.get(CONF_PORT)
+        )
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await AtreaMetadataCache(hass, entry.entry_id).async_remove()
+    await async_get_client_pool(hass).async_release_client(
+        entry.data.get(CONF_IP_ADDRESS), entry.data.get(CONF_PORT), True
+    )
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
-    async def async_update_data():
-        hass.data[DOMAIN][entry.entry_id]["status"] = await hass.async_add_executor_job(
-            atrea.getStatus, False
+    async def async_update_metadata():
+        data = hass.data[DOMAIN][entry.entry_id]
+        data["params"] = await client.async_get_params()
+        # getSupported*Modes cache forever, reload so firmware changes apply
+        if await client.async_run_job(reloadSupportedModes, atrea):
+            data["supportedModes"] = atrea.getSupportedModes().items()
+            data["supportedForcedModes"] = atrea.getSupportedForcedModes().items()
+        data["userLabels"] = await client.async_run_job(atrea.loadUserLabels)
+        data["metadataUpdated"] = time.monotonic()
+        # warning and alert codes come with the params
+        client.query_plan = async_build_query_plan(hass, entry, data["params"])
+
+    async def async_update_descriptions():
+        data = hass.data[DOMAIN][entry.entry_id]
+        configuration = await client.async_run_job(reloadConfiguration, atrea)
+        if configuration:
+            data["configDir"], data["model"] = configuration
+        data["translations"] = atrea.translations
+        firmwareCoordinator = data["firmwareCoordinator"]
+        await firmwareCoordinator.async_refresh()
+
+        # Entities registered the device before the model and firmware loaded
+        devices = dr.async_get(hass)
+        device = devices.async_get_device(
+            identifiers={(DOMAIN, slugify(f"atrea_{entry.data.get(CONF_IP_ADDRESS)}"))}
         )
-        hass.data[DOMAIN][entry.entry_id]["params"] = await hass.async_add_executor_job(
-            atrea.getParams, False
+        firmware = firmwareCoordinator.data or {}
+        if device is not None and data["model"]:
+            devices.async_update_device(
+                device.id,
+                model=data["model"]["category"] + " " + data["model"]["model"],
+                sw_version=firmware.get("installed"),
+                hw_version=firmware.get("id") or None,
+            )
+        # names and attributes of all entities may use the new translations
+        data["descriptionsLoaded"] = True
+        data["coordinator"].async_update_all_listeners()
+
+    async def async_revalidate_metadata(reload=True):
+        data = hass.data[DOMAIN][entry.entry_id]
+        if reload:
+            await async_update_metadata()
+        await async_update_descriptions()
+        data["metadataVersion"] = atrea.getVersion()
+        await data["cache"].async_save(atrea, data)
+
+    async def async_load_in_background(reload):
+        try:
+            await async_revalidate_metadata(reload)
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.warning(
+                "[%s] Could not load Atrea metadata, retrying after restart: %r",
+                entry.data.get(CONF_IP_ADDRESS),
+                err,
+            )
+            data = hass.data[DOMAIN][entry.entry_id]
+            if not data["descriptionsLoaded"]:
+                # create the waiting condition buttons named by their codes
+                data["descriptionsLoaded"] = True
+                data["coordinator"].async_update_all_listeners()
+
+    async def async_update_data():
+        data = hass.data[DOMAIN][entry.entry_id]
+        status = await client.async_get_status()
+        if not status:
+            # entities reading the last snapshot become unavailable
+            raise UpdateFailed("Incorrect password or too many signed in users.")
+        data["status"] = status
+
+        # Params, modes and labels only change with configuration or firmware,
+        # refresh them on a slow cadence instead of on every status poll.
+        version = atrea.getVersion()
+        stale = version != data["metadataVersion"]
+        due = (
+            time.monotonic() - data["metadataUpdated"]
+            >= METADATA_REFRESH_INTERVAL.total_seconds()
         )
-        hass.data[DOMAIN][entry.entry_id]["supportedModes"] = (
-            await hass.async_add_executor_job(atrea.getSupportedModes)
-        ).items()
-        hass.data[DOMAIN][entry.entry_id]["userLabels"] = (
-            await hass.async_add_executor_job(atrea.loadUserLabels)
+        if (stale and not data["metadataFailed"]) or due:
+            try:
+                if stale:
+                    LOGGER.debug("Revalidating Atrea metadata (firmware %s).", version)
+                    await async_revalidate_metadata()
+                else:
+                    LOGGER.debug("Refreshing Atrea metadata (firmware %s).", version)
+                    await async_update_metadata()
+                data["metadataFailed"] = False
+            except Exception as err:  # pylint: disable=broad-except
+                # the status is fine, keep the poll and retry on the slow tier
+                LOGGER.warning(
+                    "[%s] Could not refresh Atrea metadata, retrying in %s: %r",
+                    entry.data.get(CONF_IP_ADDRESS),
+                    METADATA_REFRESH_INTERVAL,
+                    err,
+                )
+                data["metadataFailed"] = True
+                data["metadataUpdated"] = time.monotonic()
+        snapshot = AtreaSnapshot.decode(
+            data["status"], data["params"], atrea, data["snapshot"]
         )
-        hass.data[DOMAIN][entry.entry_id]["supportedForcedModes"] = (
-            await hass.async_add_executor_job(atrea.getSupportedForcedModes)
-        ).items()
+        if snapshot.conditions_raised or snapshot.conditions_cleared:
+            LOGGER.debug(
+                "Atrea conditions raised: %s, cleared: %s.",
+                sorted(snapshot.conditions_raised),
+                sorted(snapshot.conditions_cleared),
+            )
+        data["snapshot"] = snapshot
+        return data["status"]
 
-    atreaCoordinator = DataUpdateCoordinator(
-        hass,
-        LOGGER,
-        name="Atrea resource status",
-        update_method=async_update_data,
-        update_interval=MIN_TIME_BETWEEN_SCANS,
-    )
+    atreaCoordinator = AtreaCoordinator(hass, entry, async_update_data)
 
-    atrea = Atrea(
+    client = await async_get_client(
+        hass,
         entry.data.get(CONF_IP_ADDRESS),
         entry.data.get(CONF_PORT),
         entry.data.get(CONF_PASSWORD),
+        entry.data.get(CONF_MODBUS_PORT, DEFAULT_MODBUS_PORT)
+        if entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT) == TRANSPORT_MODBUS
+        else None,
+    )
+    atrea = client.atrea
+    # In debug mode report pyatrea calls that stall the event loop
+    loopAudit = (
+        enable_loop_audit(atrea) if LOGGER.isEnabledFor(logging.DEBUG) else None
     )
 
-    status = await hass.async_add_executor_job(atrea.getStatus, False)
+    cache = AtreaMetadataCache(hass, entry.entry_id)
+    cached = await cache.async_load()
 
-    if not status:
+    setup_started = time.monotonic()
+    try:
+        async with async_get_poll_scheduler(hass).semaphore:
+            status = await client.async_get_status()
+    except (TimeoutError, ClientError) as err:
+        if cached is None:
+            raise ConfigEntryNotReady(f"Atrea unit is not responding: {err!r}") from err
+        LOGGER.debug("Atrea unit is not responding: %r", err)
+        status = False
+
+    if not status and cached is None:
         raise ConfigEntryNotReady("Incorrect password or too many signed in users.")
+
+    if not status:
+        # Come up from the cache and let the coordinator retry the unit.
+        # Cached status keeps pyatrea getters from downloading on the loop.
+        LOGGER.warning(
+            "[%s] Atrea unit is offline, setting up from cached metadata.",
+            entry.data.get(CONF_IP_ADDRESS),
+        )
+        status = atrea.status = cached["status"]
+        metadata = restore_metadata(cached, atrea)
+        source = "offline cache"
+    elif is_cache_valid(cached, atrea):
+        metadata = restore_metadata(cached, atrea)
+        source = "cache"
     else:
-        hass.data.setdefault(DOMAIN, {})
-
-        hass.data[DOMAIN][entry.entry_id] = {
-            "atrea": atrea,
-            "update_listener": entry.add_update_listener(update_listener),
-            "coordinator": atreaCoordinator,
-            "supportedModes": (
-                await hass.async_add_executor_job(atrea.getSupportedModes)
-            ).items(),
-            "userLabels": (await hass.async_add_executor_job(atrea.loadUserLabels)),
-            "supportedForcedModes": (
-                await hass.async_add_executor_job(atrea.getSupportedForcedModes)
-            ).items(),
-            "status": status,
-            "model": (await hass.async_add_executor_job(atrea.getModel)),
-            "params": (await hass.async_add_executor_job(atrea.getParams, False)),
-            "translations": (await hass.async_add_executor_job(atrea.getTranslations)),
-            "configDir": (await hass.async_add_executor_job(atrea.getConfigDir)),
+        # The embedded web server handles only a few parallel requests well.
+        semaphore = asyncio.Semaphore(SETUP_PARALLEL_REQUESTS)
+
+        async def async_fetch(target, *args):
+            async with semaphore:
+                return await client.async_run_job(target, *args)
+
+        async def async_fetch_params():
+            async with semaphore:
+                return await client.async_get_params()
+
+        # Entities need only these, translations, config dir, model and
+        # firmware are loaded after the platforms are set up.
+        try:
+            (
+                (supportedModes, supportedForcedModes),
+                userLabels,
+                params,
+            ) = await asyncio.gather(
+                async_fetch(getSupportedModes, atrea),
+                async_fetch(atrea.loadUserLabels),
+                async_fetch_params(),
+            )
+        except (TimeoutError, ClientError) as err:
+            raise ConfigEntryNotReady(
+                f"Atrea unit stopped responding during setup: {err!r}"
+            ) from err
+        metadata = {
+            "supportedModes": supportedModes.items(),
+            "supportedForcedModes": supportedForcedModes.items(),
+            "userLabels": userLabels,
+            "params": params,
+            "model": False,
+            "translations": atrea.translations,
+            "configDir": False,
         }
-        entry.async_on_unload(hass.data[DOMAIN][entry.entry_id]["update_listener"])
+        source = "unit"
+    firmwareCoordinator = AtreaFirmwareCoordinator(hass, client)
+    if source != "unit":
+        # read from the cached status, no request is made
+        await firmwareCoordinator.async_refresh()
 
-        await hass.async_create_task(
-            hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    LOGGER.debug(
+        "[%s] Atrea setup data loaded from %s in %.2f s.",
+        entry.data.get(CONF_IP_ADDRESS),
+        source,
+        time.monotonic() - setup_started,
+    )
+
+    hass.data.setdefault(DOMAIN, {})
+
+    hass.data[DOMAIN][entry.entry_id] = {
+        "atrea": atrea,
+        "client": client,
+        "transport": (
+            entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT),
+            entry.data.get(CONF_MODBUS_PORT, DEFAULT_MODBUS_PORT),
+        ),
+        "cache": cache,
+        "update_listener": entry.add_update_listener(update_listener),
+        "coordinator": atreaCoordinator,
+        "firmwareCoordinator": firmwareCoordinator,
+        **metadata,
+        "status": status,
+        "snapshot": AtreaSnapshot.decode(status, metadata["params"], atrea),
+        "metadataUpdated": time.monotonic(),
+        "metadataVersion": atrea.getVersion(),
+        "metadataFailed": False,
+        # condition buttons are named by translations, which a fresh setup
+        # loads after the platforms
+        "descriptionsLoaded": source != "unit",
+        "loopAudit": loopAudit,
+    }
+    entry.async_on_unload(hass.data[DOMAIN][entry.entry_id]["update_listener"])
+
+    if source == "offline cache":
+        # the first successful poll revalidates the whole cache
+        hass.data[DOMAIN][entry.entry_id]["metadataVersion"] = None
+        atreaCoordinator.last_update_success = False
+
+    await hass.async_create_task(
+        hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    )
+    # Entities are registered now, later polls keep only the registers they
+    # read. Enabling an entity reloads the entry and so rebuilds the plan.
+    client.query_plan = async_build_query_plan(hass, entry, metadata["params"])
+
+    if source != "offline cache":
+        # a fresh setup still misses the descriptions, a cached one revalidates
+        entry.async_create_background_task(
+            hass,
+            async_load_in_background(source == "cache"),
+            f"{DOMAIN} metadata loading",
         )
-        return True
+    return True
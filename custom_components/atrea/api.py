@@ -0,0 +1,416 @@
+"""Asyncio transport for the ATREA web server XML API."""
+
+import asyncio
+import bisect
+import functools
+import hashlib
+import time
+from collections import deque
+from collections.abc import Callable
+from functools import partial
+from xml.etree import ElementTree as ET
+
+from aiohttp import ClientSession
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from pyatrea import Atrea
+
+from .const import (
+    DOMAIN,
+    EXECUTOR_TIMEOUT,
+    LATENCY_BUCKETS,
+    LOGGER,
+    MAX_INFLIGHT_REQUESTS,
+    RECENT_FAILURES,
+    REQUEST_TIMEOUTS,
+    SESSION_SAVE_DELAY,
+    SESSION_STORAGE_KEY,
+    SESSION_STORAGE_VERSION,
+)
+
+FORBIDDEN = b"HTTP: 403 Forbidden"
+DATA_CLIENT_POOL = f"{DOMAIN}_client_pool"
+
+
+def _timed(operation: str):
+    """Apply the operation's deadline and record its latency and errors.
+
+    On the deadline the request is cancelled and TimeoutError raised.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            started = time.monotonic()
+            try:
+                async with asyncio.timeout(REQUEST_TIMEOUTS[operation]):
+                    return await func(self, *args, **kwargs)
+            except Exception as err:
+                self._note_failure(operation, repr(err))
+                raise
+            finally:
+                duration = time.monotonic() - started
+                histogram = self.latency.setdefault(
+                    operation, [0] * (len(LATENCY_BUCKETS) + 1)
+                )
+                histogram[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+        return wrapper
+
+    return decorator
+
+
+class AtreaClient:
+    """Perform the frequent ATREA requests without an executor thread.
+
+    Responses are stored on the wrapped pyatrea ``Atrea`` object, so its
+    in-memory helpers such as ``getValue``, ``getMode`` or ``setCommand`` keep
+    working on the data fetched here.
+
+    ``latency`` holds a histogram per operation with counts of calls up to
+    each of ``LATENCY_BUCKETS`` seconds and a last bucket for slower ones.
+    ``failures`` keeps the most recent failed calls.
+
+    At most ``MAX_INFLIGHT_REQUESTS`` requests and as many executor jobs run
+    at once, so a hung unit cannot tie up more than that.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        atrea: Atrea,
+        code_listener: Callable[[str], None] | None = None,
+    ) -> None:
+        self._session = session
+        self.atrea = atrea
+        self._code_listener = code_listener
+        self._auth_lock = asyncio.Lock()
+        self._inflight = asyncio.Semaphore(MAX_INFLIGHT_REQUESTS)
+        self._executor_slots = asyncio.Semaphore(MAX_INFLIGHT_REQUESTS)
+        self.latency: dict[str, list[int]] = {}
+        self.failures: deque[dict] = deque(maxlen=RECENT_FAILURES)
+        self.query_plan: frozenset[str] | None = None
+
+    def _note_failure(self, operation: str, error: str) -> None:
+        """Remember a failed call for diagnostics."""
+        self.failures.append(
+            {
+                "time": dt_util.utcnow().isoformat(),
+                "operation": operation,
+                "error": error,
+            }
+        )
+
+    async def _async_get(self, path: str, commands: str = "") -> tuple[int, bytes]:
+        """Request a path with the session code and any commands appended."""
+        url = self.atrea.getURL(path) + commands
+        async with self._inflight, self._session.get(url) as response:
+            return response.status, await response.read()
+
+    async def async_run_job(self, target: Callable, *args):
+        """Run a blocking pyatrea call in the executor.
+
+        pyatrea requests have no timeout and threads cannot be cancelled. A
+        slot is released only when its thread returns, so callers time out
+        while a hung unit keeps at most its slots of the shared executor.
+        """
+        async with asyncio.timeout(EXECUTOR_TIMEOUT):
+            await self._executor_slots.acquire()
+        future = asyncio.get_running_loop().run_in_executor(None, target, *args)
+        future.add_done_callback(self._release_executor_slot)
+        async with asyncio.timeout(EXECUTOR_TIMEOUT):
+            return await asyncio.shield(future)
+
+    def _release_executor_slot(self, future: asyncio.Future) -> None:
+        """Free the slot of a finished job, consuming an abandoned result."""
+        self._executor_slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            LOGGER.debug("Atrea executor job failed: %s", future.exception())
+
+    async def _async_get_authorized(
+        self, path: str, commands: str = ""
+    ) -> tuple[int, bytes]:
+        """Request a path, signing in again once if the session expired.
+
+        Concurrent requests that hit the same expired code wait for a single
+        sign-in, since every login takes one of the unit's few user slots.
+        """
+        code = self.atrea.code
+        status, body = await self._async_get(path, commands)
+        if status != 200 or FORBIDDEN not in body:
+            return status, body
+
+        async with self._auth_lock:
+            if self.atrea.code != code:
+                # another request signed in while this one was waiting
+                status, body = await self._async_get(path, commands)
+                if status != 200 or FORBIDDEN not in body:
+                    return status, body
+            await self.async_auth()
+        return await self._async_get(path, commands)
+
+    @_timed("auth")
+    async def async_auth(self, password: str | None = None) -> bool:
+        """Sign in and store the new session code.
+
+        A given password replaces the stored one only if the unit accepts it.
+        """
+        if password is None:
+            password = self.atrea.password
+        magic = hashlib.md5(("\r\n" + password).encode("utf-8")).hexdigest()
+        status, body = await self._async_get("config/login.cgi?magic=" + magic)
+        if status != 200:
+            return False
+        code = ET.fromstring(body).text
+        if code == "denied":
+            return False
+        if code is None:
+            # Older web interfaces answer with their 404 page, they need no
+            # sign-in. Check the password with a status read instead.
+            self.atrea.code = ""
+            status, body = await self._async_get("config/xml.xml")
+            if status != 200 or FORBIDDEN in body:
+                return False
+            self.atrea.password = password
+            return True
+        self.atrea.code = code
+        self.atrea.password = password
+        if self._code_listener is not None:
+            self._code_listener(code)
+        return True
+
+    @_timed("probe")
+    async def async_is_atrea_unit(self) -> bool:
+        """Probe the login endpoint without signing in."""
+        status, body = await self._async_get("config/login.cgi?magic=")
+        if status != 200:
+            return False
+        if ET.fromstring(body).text == "denied":
+            return True
+        if b"HTTP: 404 Page (/config/login.cgi)" not in body:
+            return False
+
+        # Older web interfaces have no login page, identify them by version
+        status, body = await self._async_get("ver.txt")
+        if status != 200:
+            return False
+        try:
+            int(body[0:2], 16)
+        except ValueError:
+            return False
+        return True
+
+    @_timed("status")
+    async def async_get_status(self) -> dict | bool:
+        """Fetch status registers, False when the unit refuses access.
+
+        The XML API always returns every register. With a ``query_plan`` only
+        the registers in it are kept, otherwise all of them.
+        """
+        return await self._async_get_xml_status()
+
+    async def _async_get_xml_status(self) -> dict | bool:
+        """Fetch and parse config/xml.xml."""
+        status, body = await self._async_get_authorized("config/xml.xml")
+        if status != 200:
+            self._note_failure("status", f"HTTP {status}")
+            return self.atrea.status
+        if FORBIDDEN in body:
+            self._note_failure("status", "forbidden")
+            return False
+
+        # Known paths to data nodes: /RD5WEB/RD5/ and /PCOWEB/PCO/
+        nodes = ET.fromstring(body)[0].iter("O")
+        plan = self.query_plan
+        if plan is None:
+            self.atrea.status = {node.get("I"): node.get("V") for node in nodes}
+        else:
+            self.atrea.status = {
+                register: node.get("V")
+                for node in nodes
+                if (register := node.get("I")) in plan
+            }
+        return self.atrea.status
+
+    @_timed("params")
+    async def async_get_params(self) -> dict:
+        """Fetch parameter metadata: IDs, warning and alert flags, scaling.
+
+        The previous params are kept when the request fails. Empty params are
+        stored if there are none yet, since pyatrea would otherwise download
+        them in the middle of staging a command on the event loop.
+        """
+        params = {
+            "warning": [],
+            "alert": [],
+            "ids": [],
+            "coefs": {},
+            "offsets": {},
+        }
+        status, body = await self._async_get_authorized("user/params.xml")
+        if status != 200 or FORBIDDEN in body:
+            self._note_failure(
+                "params", f"HTTP {status}" if status != 200 else "forbidden"
+            )
+            if not self.atrea.params:
+                self.atrea.params = params
+            return self.atrea.params
+
+        for node in ET.fromstring(body).iterfind("params/i"):
+            attrib = node.attrib
+            if "id" not in attrib:
+                continue
+            param_id = attrib["id"]
+            params["ids"].append(param_id)
+            flag = attrib.get("flag")
+            if flag == "W":
+                params["warning"].append(param_id)
+            elif flag == "A":
+                params["alert"].append(param_id)
+            if "coef" in attrib:
+                params["coefs"][param_id] = float(attrib["coef"])
+            if "offset" in attrib:
+                params["offsets"][param_id] = float(attrib["offset"])
+
+        self.atrea.params = params
+        return params
+
+    @_timed("exec")
+    async def async_exec(self, commands: dict[str, str] | None = None) -> bool:
+        """Send the given commands, by default those queued on pyatrea."""
+        if commands is None:
+            commands = self.atrea.commands
+        if not commands:
+            return False
+        return await self._async_write_xml(commands)
+
+    @_timed("exec")
+    async def async_execute_one_shot_command(
+        self, register: str, value: int = 1
+    ) -> bool:
+        """Write one register without touching the queued commands."""
+        if (
+            not isinstance(register, str)
+            or len(register) != 6
+            or not register[0].isalpha()
+            or not register[1:].isdigit()
+            or not isinstance(value, int)
+            or not 0 <= value <= 65535
+        ):
+            return False
+
+        return await self._async_write_xml({register: f"{value:05}"})
+
+    async def _async_write_xml(self, commands: dict[str, str]) -> bool:
+        """Send zero-padded command values to config/xml.cgi."""
+        query = "".join(f"&{register}{value}" for register, value in commands.items())
+        status, body = await self._async_get_authorized("config/xml.cgi", query)
+        return self._exec_succeeded(status, body)
+
+    async def async_close(self) -> None:
+        """Release connections of the client, the HTTP session is shared."""
+
+    def _exec_succeeded(self, status: int, body: bytes) -> bool:
+        """Return whether the unit accepted a command, noting refusals."""
+        if status == 200 and FORBIDDEN not in body:
+            return True
+        self._note_failure("exec", f"HTTP {status}" if status != 200 else "forbidden")
+        return False
+
+
+class AtreaClientPool:
+    """Share one client, and so one signed-in session, per unit.
+
+    The unit allows only a few signed-in users. Session codes are kept in
+    Home Assistant storage so restarts reuse them instead of signing in again.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._store = Store(hass, SESSION_STORAGE_VERSION, SESSION_STORAGE_KEY)
+        self._lock = asyncio.Lock()
+        self._codes: dict[str, str] | None = None
+        self._clients: dict[str, AtreaClient] = {}
+
+    async def async_get_client(
+        self,
+        host: str,
+        port: int,
+        password: str | None = None,
+        modbus_port: int | None = None,
+    ) -> AtreaClient:
+        """Return the client of a unit, updating its password if given.
+
+        With a Modbus port a new client polls over Modbus TCP. The transport
+        of an existing client is kept until it is released.
+        """
+        key = f"{host}:{port}"
+        async with self._lock:
+            codes = await self._async_load_codes()
+            client = self._clients.get(key)
+            if client is None:
+                LOGGER.debug("[%s] Creating Atrea client.", key)
+                args = (
+                    async_get_clientsession(self._hass),
+                    Atrea(host, port, password or "", codes.get(key) or ""),
+                    partial(self._async_save_code, key),
+                )
+                if modbus_port is None:
+                    client = AtreaClient(*args)
+                else:
+                    # the Modbus client subclasses AtreaClient, import it late
+                    from .modbus import AtreaModbusClient
+
+                    client = AtreaModbusClient(*args, modbus_port)
+                self._clients[key] = client
+            elif password is not None:
+                client.atrea.password = password
+        return client
+
+    async def async_release_client(
+        self, host: str, port: int, forget_session: bool = False
+    ) -> None:
+        """Drop the client of a unit, optionally forgetting its session code."""
+        key = f"{host}:{port}"
+        async with self._lock:
+            client = self._clients.pop(key, None)
+            if client is not None:
+                await client.async_close()
+            codes = await self._async_load_codes()
+            if forget_session and codes.pop(key, None):
+                self._store.async_delay_save(lambda: self._codes, SESSION_SAVE_DELAY)
+
+    async def _async_load_codes(self) -> dict[str, str]:
+        """Load stored session codes on first use."""
+        if self._codes is None:
+            self._codes = await self._store.async_load() or {}
+        return self._codes
+
+    @callback
+    def _async_save_code(self, key: str, code: str) -> None:
+        """Persist a new session code."""
+        self._codes[key] = code
+        self._store.async_delay_save(lambda: self._codes, SESSION_SAVE_DELAY)
+
+
+@callback
+def async_get_client_pool(hass: HomeAssistant) -> AtreaClientPool:
+    """Return the client pool shared by all entries."""
+    if DATA_CLIENT_POOL not in hass.data:
+        hass.data[DATA_CLIENT_POOL] = AtreaClientPool(hass)
+    return hass.data[DATA_CLIENT_POOL]
+
+
+async def async_get_client(
+    hass: HomeAssistant,
+    host: str,
+    port: int,
+    password: str | None = None,
+    modbus_port: int | None = None,
+) -> AtreaClient:
+    """Return the shared client of a unit."""
+    return await async_get_client_pool(hass).async_get_client(
+        host, port, password, modbus_port
+    )
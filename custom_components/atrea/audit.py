@@ -0,0 +1,61 @@
+"""Debug audit of pyatrea calls made on the event loop."""
+
+import functools
+import threading
+import time
+
+from pyatrea import Atrea
+
+from .const import LOGGER, LOOP_AUDIT_THRESHOLD
+
+
+class AtreaLoopAudit:
+    """Time pyatrea calls made on the event loop thread.
+
+    Calls slower than the threshold are logged and counted per method.
+    Nested calls are attributed to the outermost one, calls from executor
+    threads are not timed.
+    """
+
+    def __init__(self, atrea: Atrea, threshold: float = LOOP_AUDIT_THRESHOLD) -> None:
+        self._loop_thread = threading.get_ident()
+        self._threshold = threshold
+        self._depth = 0
+        self.offenders: dict[str, dict[str, float]] = {}
+        for name in dir(Atrea):
+            if not name.startswith("_") and callable(getattr(Atrea, name)):
+                setattr(atrea, name, self._wrap(name, getattr(atrea, name)))
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if self._depth or threading.get_ident() != self._loop_thread:
+                return method(*args, **kwargs)
+            self._depth += 1
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                self._record(name, time.perf_counter() - started)
+
+        return wrapper
+
+    def _record(self, name: str, duration: float) -> None:
+        if duration < self._threshold:
+            return
+        offender = self.offenders.setdefault(name, {"count": 0, "total": 0, "max": 0})
+        offender["count"] += 1
+        offender["total"] += duration
+        offender["max"] = max(offender["max"], duration)
+        LOGGER.warning(
+            "pyatrea %s blocked the event loop for %.1f ms.", name, duration * 1000
+        )
+
+
+def enable_loop_audit(atrea: Atrea) -> AtreaLoopAudit:
+    """Audit an Atrea object, reusing its audit when it is already wrapped."""
+    audit = atrea.__dict__.get("_loop_audit")
+    if audit is None:
+        audit = atrea._loop_audit = AtreaLoopAudit(atrea)
+    return audit
@@ -29,13 +29,19 @@ async def async_setup_entry(
     data = hass.data[DOMAIN][entry.entry_id]
     coordinator = data["coordinator"]
     known_registers: set[str] = set()
+    fingerprint = None
 
     def async_discover_sensors() -> None:
-        status = data.get("status") or {}
+        nonlocal fingerprint
+        snapshot = data["snapshot"]
+        if snapshot.key_generation == fingerprint:
+            return
+        fingerprint = snapshot.key_generation
+        values = snapshot.values
         entities = []
 
         for register, (name, icon) in BINARY_SENSOR_REGISTERS.items():
-            if register not in status or register in known_registers:
+            if register not in values or register in known_registers:
                 continue
             known_registers.add(register)
             entities.append(
@@ -62,7 +68,7 @@ class AtreaRegisterBinarySensor(CoordinatorEntity, BinarySensorEntity):
         name: str,
         icon: str,
     ) -> None:
-        super().__init__(data["coordinator"])
+        super().__init__(data["coordinator"], frozenset({register}))
         self._data = data
         self._register = register
         self._attr_name = name
@@ -79,16 +85,12 @@ class AtreaRegisterBinarySensor(CoordinatorEntity, BinarySensorEntity):
     @property
     def available(self) -> bool:
         """Report whether the register is present in the latest status."""
-        return (
-            super().available
-            and self._register in (self._data.get("status") or {})
-        )
+        return super().available and self._register in self._data["snapshot"].values
 
     @property
     def is_on(self) -> bool | None:
-        """Return whether heat-pump defrost is active."""
-        value = (self._data.get("status") or {}).get(self._register)
-        return None if value is None else str(value) == "1"
+        """Return whether the input or state is active."""
+        return self._data["snapshot"].values.get(self._register)
 
     @property
     def extra_state_attributes(self) -> dict:
@@ -2,6 +2,7 @@
 
 from collections.abc import Callable
 
+from aiohttp import ClientError
 from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_IP_ADDRESS, CONF_NAME
@@ -11,6 +12,7 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
 from .const import DOMAIN
+from .utils import getTranslation
 
 FILTER_WARNING_CODE = "D11183"
 FILTER_ACKNOWLEDGE_REGISTER = "C10007"
@@ -28,11 +30,15 @@ async def async_setup_entry(
     known_conditions: set[tuple[str, str]] = set()
 
     def async_discover_conditions() -> None:
+        if not data["descriptionsLoaded"]:
+            # the entity ID is made from the name, wait for the translations
+            return
+        conditions = data["snapshot"].conditions
+        if conditions <= known_conditions:
+            return
         entities = []
-        for severity, code in _active_conditions(data):
-            key = (severity, code)
-            if key in known_conditions:
-                continue
+        for key in conditions - known_conditions:
+            severity, code = key
             known_conditions.add(key)
             entities.append(AtreaConditionButton(entry, data, severity, code))
 
@@ -43,20 +49,6 @@ async def async_setup_entry(
     entry.async_on_unload(coordinator.async_add_listener(async_discover_conditions))
 
 
-def _active_conditions(data: dict) -> list[tuple[str, str]]:
-    """Return active warning and alert parameter IDs."""
-    status = data.get("status") or {}
-    params = data.get("params") or {}
-    conditions = []
-
-    for severity in ("warning", "alert"):
-        for code in params.get(severity, []):
-            if str(status.get(code, "0")) == "1":
-                conditions.append((severity, code))
-
-    return conditions
-
-
 class AtreaConditionButton(CoordinatorEntity, ButtonEntity):
     """A button representing one ATREA condition."""
 
@@ -69,7 +61,7 @@ class AtreaConditionButton(CoordinatorEntity, ButtonEntity):
         severity: str,
         code: str,
     ) -> None:
-        super().__init__(data["coordinator"])
+        super().__init__(data["coordinator"], frozenset({code}))
         self._data = data
         self._severity = severity
         self._code = code
@@ -80,7 +72,6 @@ class AtreaConditionButton(CoordinatorEntity, ButtonEntity):
         self._attr_unique_id = slugify(
             f"{device_unique_id}_{severity}_{code}"
         )
-        self._attr_name = self._translation
         self._attr_icon = (
             "mdi:alert-octagon-outline"
             if severity == "alert"
@@ -91,16 +82,21 @@ class AtreaConditionButton(CoordinatorEntity, ButtonEntity):
             "name": entry.data.get(CONF_NAME) or "atrea",
         }
 
+    @property
+    def name(self) -> str:
+        """Return the translated condition, which may load after setup."""
+        return self._translation
+
     @property
     def _translation(self) -> str:
         """Return the unit-provided text, falling back to the parameter ID."""
-        return self._atrea.getTranslation(self._code) or self._code
+        return getTranslation(self._atrea, self._code) or self._code
 
     @property
     def available(self) -> bool:
         """Only allow interaction while this condition is active."""
         return super().available and (
-            (self._severity, self._code) in _active_conditions(self._data)
+            (self._severity, self._code) in self._data["snapshot"].conditions
         )
 
     @property
@@ -135,12 +131,18 @@ class AtreaConditionButton(CoordinatorEntity, ButtonEntity):
                 f"ATREA warning {self._code} cannot be acknowledged"
             )
 
-        success = await self.hass.async_add_executor_job(
-            self._atrea.executeOneShotCommand, register, 1
-        )
+        try:
+            success = await self._data["client"].async_execute_one_shot_command(
+                register, 1
+            )
+        except (TimeoutError, ClientError) as err:
+            raise HomeAssistantError(
+                f"ATREA did not respond to acknowledgement register {register}"
+            ) from err
         if not success:
             raise HomeAssistantError(
                 f"ATREA did not accept acknowledgement register {register}"
             )
 
+        self.coordinator.async_note_command()
         await self.coordinator.async_request_refresh()
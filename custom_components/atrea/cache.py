@@ -0,0 +1,110 @@
+"""Persistent cache of the slowly changing metadata of a unit."""
+
+from xml.etree import ElementTree as ET
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from pyatrea import Atrea, AtreaMode
+
+from .const import DOMAIN, METADATA_STORAGE_VERSION
+
+
+class AtreaMetadataCache:
+    """Metadata of one entry kept in Home Assistant storage.
+
+    Translations, config directory, model, params, modes and user labels only
+    change with the unit's configuration or firmware. The cache is valid for
+    the unit ID and firmware version it was stored with, and also keeps the
+    last status so entities can be created while the unit is offline.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store = Store(
+            hass, METADATA_STORAGE_VERSION, f"{DOMAIN}.metadata.{entry_id}"
+        )
+
+    async def async_load(self) -> dict | None:
+        """Return the stored metadata, or None when nothing is stored."""
+        return await self._store.async_load()
+
+    async def async_save(self, atrea: Atrea, data: dict) -> None:
+        """Store the metadata of the unit from the entry data."""
+        config_dir = data["configDir"]
+        await self._store.async_save(
+            {
+                "unit_id": atrea.getID(),
+                "version": atrea.getVersion(),
+                "status": data["status"],
+                "params": data["params"],
+                "userLabels": data["userLabels"],
+                "model": data["model"],
+                "translations": atrea.translations,
+                "configDir": (
+                    ET.tostring(config_dir, encoding="unicode")
+                    if isinstance(config_dir, ET.Element)
+                    else None
+                ),
+                "writableModes": {
+                    int(mode): writable
+                    for mode, writable in atrea.writable_modes.items()
+                },
+                "idsToModes": {
+                    mode_id: int(mode) for mode_id, mode in atrea.idsToModes.items()
+                },
+                "forcedModes": (
+                    None
+                    if atrea.forcedModes is None
+                    else {
+                        mode_id: int(mode)
+                        for mode_id, mode in atrea.forcedModes.items()
+                    }
+                ),
+            }
+        )
+
+    async def async_remove(self) -> None:
+        """Remove the stored metadata."""
+        await self._store.async_remove()
+
+
+def is_cache_valid(cached: dict | None, atrea: Atrea) -> bool:
+    """Return whether cached metadata belongs to the unit and its firmware."""
+    return (
+        cached is not None
+        and cached["unit_id"] == atrea.getID()
+        and cached["version"] == atrea.getVersion()
+    )
+
+
+def restore_metadata(cached: dict, atrea: Atrea) -> dict:
+    """Load cached metadata into pyatrea and return it as entry data.
+
+    JSON turns the integer keys of the mode tables into strings, they are
+    converted back here.
+    """
+    config_dir = ET.fromstring(cached["configDir"]) if cached["configDir"] else False
+    atrea.translations = cached["translations"]
+    atrea.configDir = {} if config_dir is False else config_dir
+    atrea.params = cached["params"]
+    atrea.writable_modes = {
+        AtreaMode(int(mode)): writable
+        for mode, writable in cached["writableModes"].items()
+    }
+    atrea.idsToModes = {
+        int(mode_id): AtreaMode(mode) for mode_id, mode in cached["idsToModes"].items()
+    }
+    atrea.modesToIds = {mode: mode_id for mode_id, mode in atrea.idsToModes.items()}
+    if cached["forcedModes"] is not None:
+        atrea.forcedModes = {
+            int(mode_id): AtreaMode(mode)
+            for mode_id, mode in cached["forcedModes"].items()
+        }
+    return {
+        "supportedModes": atrea.writable_modes.items(),
+        "supportedForcedModes": (atrea.forcedModes or {}).items(),
+        "userLabels": cached["userLabels"],
+        "params": cached["params"],
+        "model": cached["model"],
+        "translations": atrea.translations,
+        "configDir": config_dir,
+    }
@@ -1,12 +1,12 @@
-import time
 import re
-from homeassistant.core import HomeAssistant
+from aiohttp import ClientError
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.util import slugify
 from homeassistant.components.climate.const import HVACAction
 
 
-from custom_components.atrea.utils import convert_temperature, processFanModes
+from custom_components.atrea.utils import getTranslation, processFanModes
 
 try:
     from homeassistant.components.climate import ClimateEntity, PLATFORM_SCHEMA
@@ -24,26 +24,61 @@ from homeassistant.const import (
     UnitOfTemperature,
     ATTR_TEMPERATURE,
 )
-from homeassistant.util import Throttle
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from typing import Callable
 from pyatrea import AtreaProgram, AtreaMode
 
 from .const import (
     DOMAIN,
     LOGGER,
-    UPDATE_DELAY,
-    MIN_TIME_BETWEEN_SCANS,
     SUPPORT_FLAGS,
     STATE_UNKNOWN,
     CONF_FAN_MODES,
     CONF_PRESETS,
+    CONF_COMMAND_DEBOUNCE,
+    DEFAULT_COMMAND_DEBOUNCE,
     DEFAULT_FAN_MODE_LIST,
     ALL_PRESET_LIST,
     ICONS,
     HVAC_MODES,
 )
 
+# Status registers behind the snapshot fields shown by the climate entity
+CLIMATE_REGISTERS = frozenset(
+    {
+        "I00200",
+        "I00202",
+        "H00511",
+        "I10211",
+        "I10212",
+        "I10213",
+        "I10214",
+        "I10215",
+        "I10205",
+        "I10206",
+        "H10202",
+        "D10200",
+        "D10201",
+        "D10202",
+        "D10203",
+        "H10700",
+        "H10704",
+        "H10705",
+        "H10706",
+        "H10712",
+        "H10714",
+        "H01000",
+        "H01001",
+        "H01005",
+        "H01006",
+        "H01015",
+        "C10215",
+        "C10216",
+    }
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: Callable
@@ -63,25 +98,30 @@ async def async_setup_entry(
         for preset in ALL_PRESET_LIST:
             preset_list[preset] = True
 
+    command_debounce = entry.data.get(
+        CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE
+    )
+
     hass.data[DOMAIN][entry.entry_id]["climate"] = AtreaDevice(
-        hass, entry, sensor_name, fan_list, preset_list
+        hass, entry, sensor_name, fan_list, preset_list, command_debounce
     )
 
     async_add_entities([hass.data[DOMAIN][entry.entry_id]["climate"]])
 
 
-class AtreaDevice(ClimateEntity):
+class AtreaDevice(CoordinatorEntity, ClimateEntity):
     def __init__(
-        self, hass, entry, sensor_name, fan_list, preset_list,
+        self, hass, entry, sensor_name, fan_list, preset_list, command_debounce,
     ):
-        super().__init__()
         self.data = hass.data[DOMAIN][entry.entry_id]
+        super().__init__(self.data["coordinator"])
         self.atrea = self.data["atrea"]
-        self._coordinator = self.data["coordinator"]
-        self._userLabels = self.data["userLabels"]
+        self.client = self.data["client"]
         self.ip = entry.data.get(CONF_IP_ADDRESS)
-        self.updatePending = False
+        self._optimistic = {}
         self._preset_list = []
+        self._preset_config = {}
+        self._preset_source = None
         self._warnings = []
         self._name = sensor_name
         self._current_fan_mode = None
@@ -108,11 +148,22 @@ class AtreaDevice(ClimateEntity):
         self._cooling = -1
         self._heating = -1
 
+        # Commands staged within the window are merged into one exec
+        self._command_debouncer = Debouncer(
+            hass,
+            LOGGER,
+            cooldown=command_debounce / 1000,
+            immediate=False,
+            function=self._async_exec_commands,
+        )
+
         self.updatePresetList(preset_list, False)
         self.updateFanList(fan_list, False)
         self.manualUpdate(False)
 
     def updatePresetList(self, preset_list, updateState=True):
+        self._preset_config = preset_list
+        self._preset_source = self.data["supportedModes"]
         self._preset_list = []
         for required_preset in preset_list:
             if preset_list[required_preset]:
@@ -120,23 +171,29 @@ class AtreaDevice(ClimateEntity):
                     if preset_supported and ALL_PRESET_LIST[i] == required_preset:
                         self._preset_list.append(ALL_PRESET_LIST[i])
         if updateState:
-            self.async_schedule_update_ha_state(True)
+            self.async_write_ha_state()
 
     def updateFanList(self, fan_list, updateState=True):
         self._fan_list = processFanModes(fan_list)
         if updateState:
-            self.async_schedule_update_ha_state(True)
+            self.async_write_ha_state()
+
+    def updateCommandDebounce(self, command_debounce):
+        self._command_debouncer.cooldown = command_debounce / 1000
 
     def updateName(self, name, updateState=True):
         self._name = name
         if updateState:
-            self.async_schedule_update_ha_state(True)
+            self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
         self._enabled = True
 
     async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
         self._enabled = False
+        self._command_debouncer.async_cancel()
 
     def getUniqueID(self):
         return slugify(f"atrea_{self.ip}")
@@ -163,10 +220,6 @@ class AtreaDevice(ClimateEntity):
             "connections": {},
         }
 
-    @property
-    def should_poll(self):
-        return True
-
     @property
     def unit_of_measurement(self):
         return self._unit
@@ -215,6 +268,9 @@ class AtreaDevice(ClimateEntity):
         attributes["active_inputs"] = self._active_inputs
         attributes["forced_mode"] = self._forced_mode.name
         attributes["current_power"] = self._current_power
+        attributes["update_interval"] = (
+            self.coordinator.poll_interval.total_seconds()
+        )
 
         if self._in1 is not None:
             attributes["in1"] = self._in1
@@ -251,8 +307,9 @@ class AtreaDevice(ClimateEntity):
 
     @property
     def preset_mode(self):
-        if self._current_preset.name and self._current_preset.name in self._userLabels:
-            return self._userLabels[self._current_preset.name]
+        userLabels = self.data["userLabels"]
+        if self._current_preset.name and self._current_preset.name in userLabels:
+            return userLabels[self._current_preset.name]
         elif self._current_preset < len(ALL_PRESET_LIST):
             return ALL_PRESET_LIST[self._current_preset]
         else:
@@ -286,106 +343,120 @@ class AtreaDevice(ClimateEntity):
     def program(self):
         return self.air_handling_control
 
-    @Throttle(MIN_TIME_BETWEEN_SCANS)
-    async def async_update(self):
-        if not self.updatePending:
-            self.updatePending = True
-            await self._coordinator.async_request_refresh()
-            await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-            self.manualUpdate()
-            self.updatePending = False
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self.manualUpdate()
+
+    async def _async_send_commands(self, **optimistic):
+        """Show the written values right away and schedule the staged commands.
+
+        The values stay applied over polled data until the exec that sends
+        them has been verified by a fresh status read.
+        """
+        self._optimistic.update(optimistic)
+        for attribute, value in optimistic.items():
+            setattr(self, attribute, value)
+        self.async_write_ha_state()
+        await self._command_debouncer.async_call()
+
+    async def _async_exec_commands(self):
+        """Send all commands staged during the debounce window in one request.
+
+        The debouncer drops calls while an exec and its verifying refresh
+        run, so whatever was staged meanwhile is sent right after. Optimistic
+        values without a command are cleared by the refresh.
+        """
+        while self._optimistic or self.atrea.commands:
+            await self._async_exec_staged()
+
+    async def _async_exec_staged(self):
+        """Send the staged commands and verify them with a fresh read.
+
+        The commands leave the shared queue when sent. Those the unit refuses
+        are dropped with their optimistic values, rather than being sent
+        later with an unrelated command after the UI showed them rolled back.
+        """
+        optimistic = self._optimistic
+        self._optimistic = {}
+        commands = dict(self.atrea.commands)
+        for register in commands:
+            del self.atrea.commands[register]
+        if commands:
+            try:
+                accepted = await self.client.async_exec(commands)
+            except (TimeoutError, ClientError) as err:
+                LOGGER.warning("Atrea commands failed: %r", err)
+                accepted = False
+            if not accepted:
+                LOGGER.warning(
+                    "Atrea did not accept commands %s, dropping them.",
+                    ", ".join(commands),
+                )
+            self.coordinator.async_note_command()
+
+        # Verify against a fresh read, values the unit did not take roll back
+        await self.coordinator.async_refresh()
+        rejected = [
+            attribute
+            for attribute, value in optimistic.items()
+            if attribute not in self._optimistic and getattr(self, attribute) != value
+        ]
+        if rejected:
+            LOGGER.warning(
+                "Atrea did not confirm %s, showing the values reported by the unit.",
+                ", ".join(attribute.lstrip("_") for attribute in rejected),
+            )
 
     def manualUpdate(self, updateState=True):
         status = self.data["status"]
-        self._id = self.atrea.getID()
+        if self.data["supportedModes"] is not self._preset_source:
+            # supported modes were reloaded by the metadata refresh
+            self.updatePresetList(self._preset_config, False)
+        firmware = self.data["firmwareCoordinator"].data or {}
+        self._id = firmware.get("id")
         self._model = self.data["model"]
-        self._swVersion = self.atrea.getVersion()
+        self._swVersion = firmware.get("installed")
         self._warnings = []
         self._alerts = []
         self._active_inputs = []
         if status != False:
-            if "I10211" in status:
-                self._outside_temp = convert_temperature(status["I10211"])
-            elif "I00202" in status:
-                if self.atrea.getValue("I00202") == 126.0:
-                    if self.atrea.getValue("H00511") == 1:
-                        self._outside_temp = self.atrea.getValue("I00200")
-                    elif self.atrea.getValue("H00511") == 1:
-                        self._outside_temp = self.atrea.getValue("I00201")
-                else:
-                    self._outside_temp = self.atrea.getValue("I00202")
-
-            # inside temperature is defined by T-IDA
-            if "I10215" in status:
-                self._inside_temp = convert_temperature(status["I10215"])
-
-            if "I10212" in status:
-                self._supply_air_temp = convert_temperature(status["I10212"])
-            elif "I00200" in status:
-                self._supply_air_temp = self.atrea.getValue("I00200")
-
-            if "I10214" in status:
-                self._exhaust_temp = convert_temperature(status["I10214"])
-
-            if "I10213" in status:
-                self._extract_temp = convert_temperature(status["I10213"])
-
-            if "H10706" in status:
-                self._requested_temp = float(status["H10706"]) / 10
-            elif "H01006" in status:
-                self._requested_temp = self.atrea.getValue("H01006")
-
-            if "H10714" in status:
-                self._requested_power = int(status["H10714"])
-            elif "H01005" in status:
-                self._requested_power = int(self.atrea.getValue("H01005"))
+            snapshot = self.data["snapshot"]
+            # keep the last temperatures when the unit stops reporting them
+            for attribute in (
+                "outside_temp",
+                "inside_temp",
+                "supply_air_temp",
+                "exhaust_temp",
+                "extract_temp",
+                "requested_temp",
+                "requested_power",
+                "in1",
+                "in2",
+                "sa1",
+                "current_power",
+            ):
+                value = getattr(snapshot, attribute)
+                if value is not None:
+                    setattr(self, "_" + attribute, value)
 
-            if "H01001" in status:
-                self._current_fan_mode = str(int(self.atrea.getValue("H01001"))) + "%"
+            if snapshot.fan_power is not None:
+                self._current_fan_mode = str(snapshot.fan_power) + "%"
             else:
                 self._current_fan_mode = str(self._requested_power) + "%"
 
-            if "C10215" in status:
-                self._heating = int(status["C10215"])
-            else:
-                self._heating = -1
-
-            if "C10216" in status:
-                self._cooling = int(status["C10216"])
-            else:
-                self._cooling = -1
-
-            # Input IN1
-            if "I10205" in status:
-                self._in1 = int(status["I10205"])
-
-            # Input IN2
-            if "I10206" in status:
-                self._in2 = int(status["I10206"])
-
-            # Output SA1
-            if "H10202" in status:
-                self._sa1 = int(status["H10202"])
-
-            # D1..D4 inputs are reported in D10200..D10203
-            for inpt in range(4):
-                entry = f"D1020{inpt}"
-                if entry in status and int(status[entry]):
-                    self._active_inputs.append(f"D{inpt + 1}")
-
-            self._forced_mode = self.atrea.getForcedMode()
+            self._heating = snapshot.heating
+            self._cooling = snapshot.cooling
+            self._active_inputs = list(snapshot.active_inputs)
+            self._forced_mode = snapshot.forced_mode
 
-            if "H10704" in status:
-                self._current_power = int(status["H10704"])
-
-            self._current_preset = self.atrea.getMode()
+            self._current_preset = snapshot.mode
             if self._current_preset == AtreaMode.OFF:
                 self._current_hvac_mode = HVACMode.OFF
 
-            program = self.atrea.getProgram()
+            program = snapshot.program
             if program == AtreaProgram.MANUAL:
                 self.air_handling_control = "Manual"
-                if self.atrea.getValue("H10705") == 0:
+                if snapshot.ventilation_off:
                     self._current_hvac_mode = HVACMode.OFF
                 else:
                     self._current_hvac_mode = HVACMode.FAN_ONLY
@@ -394,7 +465,7 @@ class AtreaDevice(ClimateEntity):
                 self._current_hvac_mode = HVACMode.AUTO
             elif program == AtreaProgram.TEMPORARY:
                 self.air_handling_control = "Temporary"
-                if self.atrea.getValue("H10705") == 0:
+                if snapshot.ventilation_off:
                     self._current_hvac_mode = HVACMode.OFF
                 else:
                     self._current_hvac_mode = HVACMode.FAN_ONLY
@@ -405,19 +476,20 @@ class AtreaDevice(ClimateEntity):
                 self._current_hvac_mode = HVACMode.OFF
 
             # todo fix warning not translated
-            params = self.atrea.getParams()
-            for warning in params["warning"]:
-                if status[warning] == "1":
-                    self._warnings.append(self.atrea.getTranslation(warning))
+            for warning in snapshot.warnings:
+                self._warnings.append(getTranslation(self.atrea, warning))
 
-            for alert in params["alert"]:
-                if status[alert] == "1":
-                    self._alerts.append(self.atrea.getTranslation(alert))
+            for alert in snapshot.alerts:
+                self._alerts.append(getTranslation(self.atrea, alert))
 
         else:
             self._current_hvac_mode = None
+
+        # values of commands not yet verified win over polled data
+        for attribute, value in self._optimistic.items():
+            setattr(self, attribute, value)
         if updateState:
-            self.async_schedule_update_ha_state(True)
+            self.async_write_ha_state()
 
     async def async_set_fan_mode(self, fan_mode):
         fan_percent = int(re.sub("[^0-9]", "", fan_mode))
@@ -426,19 +498,13 @@ class AtreaDevice(ClimateEntity):
         if fan_percent > 100:
             fan_percent = 100
         if fan_percent >= 12 and fan_percent <= 100:
-            if (
-                await self.hass.async_add_executor_job(self.atrea.getProgram)
-                == AtreaProgram.WEEKLY
-            ):
+            if self.data["snapshot"].program == AtreaProgram.WEEKLY:
                 self.atrea.setProgram(AtreaProgram.TEMPORARY)
             self.atrea.setPower(fan_percent)
 
-            self.updatePending = True
-            await self.hass.async_add_executor_job(self.atrea.exec)
-            await self._coordinator.async_request_refresh()
-            await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-            self.updatePending = False
-            self.manualUpdate()
+            await self._async_send_commands(
+                _current_fan_mode=f"{fan_percent}%", _requested_power=fan_percent
+            )
         else:
             LOGGER.warn("Power out of range (12,100)")
 
@@ -454,12 +520,10 @@ class AtreaDevice(ClimateEntity):
             self._current_hvac_mode = HVACMode.FAN_ONLY
         self.atrea.setMode(AtreaMode.VENTILATION)
 
-        self.updatePending = True
-        await self.hass.async_add_executor_job(self.atrea.exec)
-        await self._coordinator.async_request_refresh()
-        await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-        self.manualUpdate()
-        self.updatePending = False
+        await self._async_send_commands(
+            _current_hvac_mode=self._current_hvac_mode,
+            _current_preset=AtreaMode.VENTILATION,
+        )
 
     async def async_turn_off(self):
         if self.air_handling_control == "Manual":
@@ -472,12 +536,9 @@ class AtreaDevice(ClimateEntity):
         self._current_hvac_mode = HVACMode.OFF
         self.atrea.setMode(AtreaMode.OFF)
 
-        self.updatePending = True
-        await self.hass.async_add_executor_job(self.atrea.exec)
-        await self._coordinator.async_request_refresh()
-        await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-        self.manualUpdate()
-        self.updatePending = False
+        await self._async_send_commands(
+            _current_hvac_mode=HVACMode.OFF, _current_preset=AtreaMode.OFF
+        )
 
     async def async_set_hvac_mode(self, hvac_mode):
         mode = None
@@ -493,9 +554,7 @@ class AtreaDevice(ClimateEntity):
             await self.async_turn_off()
             self._current_hvac_mode = HVACMode.OFF
 
-        if program != None and program != await self.hass.async_add_executor_job(
-            self.atrea.getProgram
-        ):
+        if program != None and program != self.data["snapshot"].program:
             self.atrea.setProgram(program)
 
         if (
@@ -503,12 +562,10 @@ class AtreaDevice(ClimateEntity):
         ) or self.air_handling_control == "Schedule":
             self.atrea.setMode(mode)
 
-        self.updatePending = True
-        await self.hass.async_add_executor_job(self.atrea.exec)
-        await self._coordinator.async_request_refresh()
-        await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-        self.manualUpdate()
-        self.updatePending = False
+        optimistic = {"_current_hvac_mode": self._current_hvac_mode}
+        if mode is not None:
+            optimistic["_current_preset"] = mode
+        await self._async_send_commands(**optimistic)
 
     async def async_set_preset_mode(self, preset_mode):
         mode = None
@@ -520,20 +577,12 @@ class AtreaDevice(ClimateEntity):
 
         if mode == AtreaMode.OFF:
             await self.async_turn_off()
-        if (
-            await self.hass.async_add_executor_job(self.atrea.getProgram)
-            == AtreaProgram.WEEKLY
-        ):
+        if self.data["snapshot"].program == AtreaProgram.WEEKLY:
             self.atrea.setProgram(AtreaProgram.TEMPORARY)
-        if mode != await self.hass.async_add_executor_job(self.atrea.getMode):
+        if mode != self.data["snapshot"].mode:
             self.atrea.setMode(mode)
 
-        self.updatePending = True
-        await self.hass.async_add_executor_job(self.atrea.exec)
-        await self._coordinator.async_request_refresh()
-        await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-        self.manualUpdate()
-        self.updatePending = False
+        await self._async_send_commands(_current_preset=mode)
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
@@ -542,12 +591,7 @@ class AtreaDevice(ClimateEntity):
             return
         elif temperature >= 10 and temperature <= 40:
             self.atrea.setTemperature(temperature)
-            self.updatePending = True
-            await self.hass.async_add_executor_job(self.atrea.exec)
-            await self._coordinator.async_request_refresh()
-            await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-            self.manualUpdate()
-            self.updatePending = False
+            await self._async_send_commands(_requested_temp=float(temperature))
         else:
             LOGGER.warn(
                 "Chosen temperature=%s is incorrect. It needs to be between 10 and 40.",
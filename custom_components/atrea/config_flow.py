@@ -1,17 +1,33 @@
 from homeassistant import config_entries
 from homeassistant.const import CONF_IP_ADDRESS, CONF_PORT, CONF_PASSWORD, CONF_NAME
 from homeassistant.core import callback
-from .utils import isAtreaUnit, processFanModes
+import asyncio
+from aiohttp import ClientError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pyatrea import Atrea
+from .api import AtreaClient, async_get_client
+from .utils import processFanModes
 import voluptuous as vol
 from .const import (
+    CONF_COMMAND_DEBOUNCE,
     CONF_FAN_MODES,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_MODBUS_PORT,
+    CONF_TRANSPORT,
+    DEFAULT_COMMAND_DEBOUNCE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_MODBUS_PORT,
+    DEFAULT_TRANSPORT,
     DOMAIN,
     LOGGER,
     CONF_PRESETS,
     ALL_PRESET_LIST,
     DEFAULT_FAN_MODE_LIST,
+    TRANSPORT_HTTP,
+    TRANSPORT_MODBUS,
 )
-from pyatrea import Atrea
 
 
 @config_entries.HANDLERS.register(DOMAIN)
@@ -61,9 +77,11 @@ class FlowHandler(config_entries.ConfigFlow):
                     host,
                     port,
                 )
-                if not (
-                    await self.hass.async_add_executor_job(isAtreaUnit, host, port)
-                ):
+                # Probing needs no session, keep the host out of the pool
+                client = AtreaClient(
+                    async_get_clientsession(self.hass), Atrea(host, port)
+                )
+                if not await client.async_is_atrea_unit():
                     raise Exception("not_atrea_unit")
 
                 self.atreaHost = host
@@ -72,7 +90,7 @@ class FlowHandler(config_entries.ConfigFlow):
 
             except Exception as e:
                 LOGGER.debug(e)
-                if "Failed to establish a new connection" in str(e):
+                if isinstance(e, (ClientError, asyncio.TimeoutError)):
                     errors["base"] = "connection_failed"
                 elif "already_configured" in str(e):
                     errors["base"] = "already_configured"
@@ -112,9 +130,11 @@ class FlowHandler(config_entries.ConfigFlow):
 
                 self.atreaPassword = password
 
-                atrea = Atrea(self.atreaHost, self.atreaPort, self.atreaPassword)
-                status = await self.hass.async_add_executor_job(atrea.getStatus)
-                if not status:
+                # Signing in once here stores the session code for the entry
+                client = await async_get_client(
+                    self.hass, self.atreaHost, self.atreaPort
+                )
+                if not await client.async_auth(self.atreaPassword):
                     raise Exception("Invalid authentication data")
 
                 LOGGER.debug("[ADD DEVICE][%s:%d] Creating new entry.", host, port)
@@ -130,7 +150,7 @@ class FlowHandler(config_entries.ConfigFlow):
 
             except Exception as e:
                 LOGGER.debug(e)
-                if "Failed to establish a new connection" in str(e):
+                if isinstance(e, (ClientError, asyncio.TimeoutError)):
                     errors["base"] = "connection_failed"
                 elif str(e) == "Invalid authentication data":
                     errors["base"] = "invalid_auth"
@@ -188,6 +208,22 @@ class AtreaOptionsFlowHandler(config_entries.OptionsFlow):
             LOGGER.debug("Incorrect fan modes: " + e)
             # pass
 
+        min_scan_interval = self.config_entry.data.get(
+            CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+        )
+        max_scan_interval = self.config_entry.data.get(
+            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+        )
+
+        command_debounce = self.config_entry.data.get(
+            CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE
+        )
+
+        transport = self.config_entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+        modbus_port = self.config_entry.data.get(
+            CONF_MODBUS_PORT, DEFAULT_MODBUS_PORT
+        )
+
         LOGGER.debug(
             "[%s] Opened Atrea options.", self.config_entry.data[CONF_IP_ADDRESS]
         )
@@ -212,6 +248,29 @@ class AtreaOptionsFlowHandler(config_entries.OptionsFlow):
                 if not processFanModes(fan_modes):
                     raise Exception("Invalid fan mode format")
 
+                LOGGER.debug("Verifying scan intervals...")
+                min_scan_interval = user_input.get(
+                    CONF_MIN_SCAN_INTERVAL, min_scan_interval
+                )
+                max_scan_interval = user_input.get(
+                    CONF_MAX_SCAN_INTERVAL, max_scan_interval
+                )
+                if not 1 <= min_scan_interval <= max_scan_interval:
+                    raise Exception("Invalid scan interval")
+
+                LOGGER.debug("Verifying command debounce...")
+                command_debounce = user_input.get(
+                    CONF_COMMAND_DEBOUNCE, command_debounce
+                )
+                if command_debounce < 0:
+                    raise Exception("Invalid command debounce")
+
+                LOGGER.debug("Verifying transport...")
+                transport = user_input.get(CONF_TRANSPORT, transport)
+                modbus_port = user_input.get(CONF_MODBUS_PORT, modbus_port)
+                if not 1 <= modbus_port <= 65535:
+                    raise Exception("Invalid Modbus port")
+
                 LOGGER.debug("Preparing save object: ip, password, name")
                 data = {
                     CONF_IP_ADDRESS: host,
@@ -221,6 +280,13 @@ class AtreaOptionsFlowHandler(config_entries.OptionsFlow):
                 }
                 LOGGER.debug("Preparing save object: fan_modes")
                 data[CONF_FAN_MODES] = fan_modes
+                LOGGER.debug("Preparing save object: scan intervals")
+                data[CONF_MIN_SCAN_INTERVAL] = min_scan_interval
+                data[CONF_MAX_SCAN_INTERVAL] = max_scan_interval
+                data[CONF_COMMAND_DEBOUNCE] = command_debounce
+                LOGGER.debug("Preparing save object: transport")
+                data[CONF_TRANSPORT] = transport
+                data[CONF_MODBUS_PORT] = modbus_port
                 LOGGER.debug("Preparing save object: presets")
                 data[CONF_PRESETS] = {}
                 for preset in ALL_PRESET_LIST:
@@ -229,9 +295,8 @@ class AtreaOptionsFlowHandler(config_entries.OptionsFlow):
 
                 LOGGER.debug("Verifying password...")
                 if password != self.config_entry.data[CONF_PASSWORD]:
-                    atrea = Atrea(host, port, password)
-                    status = await self.hass.async_add_executor_job(atrea.getStatus)
-                    if not status:
+                    client = await async_get_client(self.hass, host, port)
+                    if not await client.async_auth(password):
                         raise Exception("Invalid authentication data")
 
                 LOGGER.debug("Saving entity...")
@@ -241,12 +306,18 @@ class AtreaOptionsFlowHandler(config_entries.OptionsFlow):
                 return self.async_create_entry(title="", data=None)
             except Exception as e:
                 LOGGER.debug(e)
-                if "Failed to establish a new connection" in str(e):
+                if isinstance(e, (ClientError, asyncio.TimeoutError)):
                     errors["base"] = "connection_failed"
                 elif str(e) == "Invalid authentication data":
                     errors["base"] = "invalid_auth"
                 elif str(e) == "Invalid fan mode format":
                     errors["base"] = "invalid_fan_mode"
+                elif str(e) == "Invalid scan interval":
+                    errors["base"] = "invalid_scan_interval"
+                elif str(e) == "Invalid command debounce":
+                    errors["base"] = "invalid_command_debounce"
+                elif str(e) == "Invalid Modbus port":
+                    errors["base"] = "invalid_modbus_port"
                 else:
                     errors["base"] = "unknown"
                     LOGGER.error(e)
@@ -258,6 +329,24 @@ class AtreaOptionsFlowHandler(config_entries.OptionsFlow):
             vol.Optional(
                 CONF_FAN_MODES, description={"suggested_value": fan_modes}
             ): str,
+            vol.Optional(
+                CONF_MIN_SCAN_INTERVAL,
+                description={"suggested_value": min_scan_interval},
+            ): int,
+            vol.Optional(
+                CONF_MAX_SCAN_INTERVAL,
+                description={"suggested_value": max_scan_interval},
+            ): int,
+            vol.Optional(
+                CONF_COMMAND_DEBOUNCE,
+                description={"suggested_value": command_debounce},
+            ): int,
+            vol.Required(CONF_TRANSPORT, default=transport): vol.In(
+                [TRANSPORT_HTTP, TRANSPORT_MODBUS]
+            ),
+            vol.Optional(
+                CONF_MODBUS_PORT, description={"suggested_value": modbus_port}
+            ): int,
         }
 
         LOGGER.debug("Preparing form... presets")
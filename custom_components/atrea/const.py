@@ -6,8 +6,34 @@ from pyatrea import AtreaMode
 
 DOMAIN = "atrea"
 LOGGER = logging.getLogger(__name__)
-UPDATE_DELAY = 1  # update delay disabled
 MIN_TIME_BETWEEN_SCANS = timedelta(seconds=10)
+# Entries are polled at evenly spread phases plus up to this many seconds
+POLL_JITTER = 0.5
+MAX_PARALLEL_POLLS = 2
+# pyatrea calls taking longer on the event loop are reported in debug mode
+LOOP_AUDIT_THRESHOLD = 0.005
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RECENT_FAILURES = 20
+# Deadlines in seconds of the requests made by the client
+REQUEST_TIMEOUTS = {"probe": 10, "auth": 10, "status": 10, "params": 15, "exec": 10}
+EXECUTOR_TIMEOUT = 30
+# Requests and pyatrea executor jobs running at once for one unit
+MAX_INFLIGHT_REQUESTS = 2
+METADATA_REFRESH_INTERVAL = timedelta(hours=1)
+FIRMWARE_CHECK_INTERVAL = timedelta(hours=6)
+SETUP_PARALLEL_REQUESTS = 3
+SESSION_STORAGE_KEY = f"{DOMAIN}.sessions"
+SESSION_STORAGE_VERSION = 1
+SESSION_SAVE_DELAY = 10
+METADATA_STORAGE_VERSION = 1
+ACTIVE_POLL_DURATION = timedelta(minutes=1)
+# Longest time a sensor inside its deadband goes without a state write
+SENSOR_HEARTBEAT = timedelta(minutes=15)
+DEFAULT_MIN_SCAN_INTERVAL = 5
+DEFAULT_MAX_SCAN_INTERVAL = 60
+DEFROST_REGISTER = "D10207"
+FIRMWARE_INSTALL_REGISTER = "I10005"
 SUPPORT_FLAGS = (
     ClimateEntityFeature.TARGET_TEMPERATURE
     | ClimateEntityFeature.FAN_MODE
@@ -20,6 +46,25 @@ STATE_MANUAL = "manual"
 STATE_UNKNOWN = "unknown"
 CONF_FAN_MODES = "fan_modes"
 CONF_PRESETS = "presets"
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_COMMAND_DEBOUNCE = "command_debounce"
+DEFAULT_COMMAND_DEBOUNCE = 500  # milliseconds
+CONF_TRANSPORT = "transport"
+CONF_MODBUS_PORT = "modbus_port"
+TRANSPORT_HTTP = "http"
+TRANSPORT_MODBUS = "modbus"
+DEFAULT_TRANSPORT = TRANSPORT_HTTP
+DEFAULT_MODBUS_PORT = 502
+MODBUS_UNIT_ID = 1
+# Unused addresses a Modbus block read may span to join two registers
+MODBUS_MAX_GAP = 8
+# Seconds a Modbus status read or request may take, so the web interface
+# can still answer a poll within its deadline
+MODBUS_TIMEOUT = 3
+# Modbus failures in a row after which the web interface is used for a while
+MODBUS_MAX_FAILURES = 3
+MODBUS_BACKOFF = timedelta(minutes=5)
 DEFAULT_FAN_MODE_LIST = "12,20,30,40,50,60,70,80,90,100"
 ALL_PRESET_LIST = [
     "Off",
@@ -0,0 +1,235 @@
+"""Data update coordinator for ATREA units."""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from .api import AtreaClient
+from .utils import readFirmware
+from .const import (
+    ACTIVE_POLL_DURATION,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFROST_REGISTER,
+    DOMAIN,
+    FIRMWARE_CHECK_INTERVAL,
+    FIRMWARE_INSTALL_REGISTER,
+    LOGGER,
+    MAX_PARALLEL_POLLS,
+    MIN_TIME_BETWEEN_SCANS,
+    POLL_JITTER,
+)
+
+DATA_POLL_SCHEDULER = f"{DOMAIN}_poll_scheduler"
+
+
+class AtreaPollScheduler:
+    """Spread the polls of all entries evenly over their interval.
+
+    Every entry gets a phase, a fraction of the interval given by its
+    position among the entries. Polls are placed at that phase plus a little
+    jitter, so units restarted together are not polled in lockstep. The
+    semaphore caps how many units are fetched at once.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._entries: list[str] = []
+        self.semaphore = asyncio.Semaphore(MAX_PARALLEL_POLLS)
+
+    @callback
+    def async_register(self, entry_id: str) -> None:
+        """Give an entry a phase, shifting the others to stay evenly spread."""
+        if entry_id not in self._entries:
+            self._entries.append(entry_id)
+
+    @callback
+    def async_unregister(self, entry_id: str) -> None:
+        """Release the phase of an entry."""
+        if entry_id in self._entries:
+            self._entries.remove(entry_id)
+
+    @callback
+    def async_delay(
+        self, entry_id: str, interval: timedelta, origin: float | None = None
+    ) -> timedelta:
+        """Return the delay to the next poll of an entry at its phase.
+
+        ``origin`` is the loop time the delay will be counted from, by
+        default now. The delay is between a half and one and a half intervals.
+        """
+        if origin is None:
+            origin = self._hass.loop.time()
+        seconds = interval.total_seconds()
+        position = self._entries.index(entry_id) if entry_id in self._entries else 0
+        phase = seconds * position / max(len(self._entries), 1)
+        phase += random.uniform(0, POLL_JITTER)
+        delay = seconds - (origin - phase) % seconds
+        if delay < seconds / 2:
+            delay += seconds
+        return timedelta(seconds=delay)
+
+
+@callback
+def async_get_poll_scheduler(hass: HomeAssistant) -> AtreaPollScheduler:
+    """Return the poll scheduler shared by all entries."""
+    if DATA_POLL_SCHEDULER not in hass.data:
+        hass.data[DATA_POLL_SCHEDULER] = AtreaPollScheduler(hass)
+    return hass.data[DATA_POLL_SCHEDULER]
+
+
+class AtreaCoordinator(DataUpdateCoordinator):
+    """Coordinator with register change tracking and adaptive polling.
+
+    Listeners added with a frozenset of register IDs as their context are
+    called only when one of those registers differs from the previous poll,
+    or when the coordinator availability changes. Other listeners are called
+    on every update.
+
+    The unit is polled at the minimum interval while it is busy: after a
+    command, during alerts, heat-pump defrost or a firmware install. While no
+    register changes, the interval doubles up to the maximum.
+
+    ``poll_interval`` is that adaptive interval. ``update_interval`` is the
+    delay to the next poll, aligned to the entry's phase by the shared
+    ``AtreaPollScheduler``.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        update_method: Callable[[], Awaitable[dict]],
+    ) -> None:
+        super().__init__(
+            hass,
+            LOGGER,
+            name="Atrea resource status",
+            update_method=update_method,
+            update_interval=MIN_TIME_BETWEEN_SCANS,
+        )
+        self._entry = entry
+        self._previous_success = True
+        self._active_until = 0.0
+        self._scheduler = async_get_poll_scheduler(hass)
+        self._scheduler.async_register(entry.entry_id)
+        self.changed_registers: frozenset[str] = frozenset()
+        self.poll_interval = MIN_TIME_BETWEEN_SCANS
+        self.min_interval = MIN_TIME_BETWEEN_SCANS
+        self.max_interval = MIN_TIME_BETWEEN_SCANS
+        self.async_set_interval_limits(
+            entry.data.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL),
+            entry.data.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+        )
+        self.update_interval = self._poll_delay(self.poll_interval)
+
+    @callback
+    def async_set_interval_limits(self, minimum: int, maximum: int) -> None:
+        """Set the polling floor and ceiling in seconds."""
+        self.min_interval = timedelta(seconds=minimum)
+        self.max_interval = timedelta(seconds=max(minimum, maximum))
+        self.poll_interval = min(
+            max(self.poll_interval, self.min_interval), self.max_interval
+        )
+
+    @callback
+    def async_note_command(self) -> None:
+        """Poll at the minimum interval for a while after a command."""
+        self._active_until = time.monotonic() + ACTIVE_POLL_DURATION.total_seconds()
+        self.poll_interval = self.min_interval
+
+    @callback
+    def async_unregister(self) -> None:
+        """Release the poll phase of the entry."""
+        self._scheduler.async_unregister(self._entry.entry_id)
+
+    async def _async_update_data(self) -> dict:
+        """Fetch status, record changed registers and adapt the interval."""
+        async with self._scheduler.semaphore:
+            status = await super()._async_update_data() or {}
+        self.changed_registers = frozenset(
+            register for register, _ in status.items() ^ (self.data or {}).items()
+        )
+        interval = self._next_interval(status)
+        if interval != self.poll_interval:
+            LOGGER.debug(
+                "Atrea polling interval changed to %s s.", interval.total_seconds()
+            )
+            self.poll_interval = interval
+        self.update_interval = self._poll_delay(interval)
+        return status
+
+    def _poll_delay(self, interval: timedelta) -> timedelta:
+        """Return the delay placing the next poll at the entry's phase.
+
+        The refresh is scheduled at the whole loop second plus the
+        coordinator's fixed fraction plus the delay, so count from there.
+        """
+        origin = int(self.hass.loop.time()) + self._microsecond
+        return self._scheduler.async_delay(self._entry.entry_id, interval, origin)
+
+    def _next_interval(self, status: dict) -> timedelta:
+        """Return the interval to use until the next poll."""
+        if self._is_active(status):
+            return self.min_interval
+        if self.changed_registers:
+            return min(
+                max(MIN_TIME_BETWEEN_SCANS, self.min_interval), self.max_interval
+            )
+        return min(self.poll_interval * 2, self.max_interval)
+
+    def _is_active(self, status: dict) -> bool:
+        """Return whether the unit is doing something worth following closely."""
+        if time.monotonic() < self._active_until:
+            return True
+        if str(status.get(DEFROST_REGISTER)) == "1":
+            return True
+        if int(status.get(FIRMWARE_INSTALL_REGISTER, 0)) > 3:
+            return True
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {})
+        snapshot = entry_data.get("snapshot")
+        return bool(snapshot and snapshot.alerts)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update general listeners and those of changed registers."""
+        notify_all = self.last_update_success != self._previous_success
+        self._previous_success = self.last_update_success
+
+        for update_callback, context in list(self._listeners.values()):
+            if (
+                notify_all
+                or not isinstance(context, frozenset)
+                or not context.isdisjoint(self.changed_registers)
+            ):
+                update_callback()
+
+    @callback
+    def async_update_all_listeners(self) -> None:
+        """Update every listener, such as after translations were loaded."""
+        for update_callback, _ in list(self._listeners.values()):
+            update_callback()
+
+
+class AtreaFirmwareCoordinator(DataUpdateCoordinator):
+    """Coordinator reading unit ID and firmware versions on a slow cadence."""
+
+    def __init__(self, hass: HomeAssistant, client: AtreaClient) -> None:
+        super().__init__(
+            hass,
+            LOGGER,
+            name="Atrea firmware",
+            update_interval=FIRMWARE_CHECK_INTERVAL,
+        )
+        self._client = client
+
+    async def _async_update_data(self) -> dict:
+        """Read versions in the executor, off the event loop."""
+        return await self._client.async_run_job(readFirmware, self._client.atrea)
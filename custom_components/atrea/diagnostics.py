@@ -0,0 +1,56 @@
+"""Diagnostics support for ATREA units."""
+
+from collections import Counter
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN, LATENCY_BUCKETS
+
+TO_REDACT = {CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return the latest unit data, request timing and polling state."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+    client = data["client"]
+    loop_audit = data.get("loopAudit")
+
+    entities = Counter(
+        entity.domain
+        for entity in er.async_entries_for_config_entry(
+            er.async_get(hass), entry.entry_id
+        )
+    )
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "model": data["model"],
+        "firmware": data["firmwareCoordinator"].data,
+        "status": data["status"],
+        "params": data["params"],
+        "polling": {
+            "poll_interval": coordinator.poll_interval.total_seconds(),
+            "min_interval": coordinator.min_interval.total_seconds(),
+            "max_interval": coordinator.max_interval.total_seconds(),
+            "last_update_success": coordinator.last_update_success,
+            "changed_registers": sorted(coordinator.changed_registers),
+            "query_plan": (
+                sorted(client.query_plan) if client.query_plan is not None else None
+            ),
+        },
+        "requests": {
+            "transport": data["transport"][0],
+            "latency_buckets": [*LATENCY_BUCKETS, "inf"],
+            "latency": client.latency,
+            "recent_failures": list(client.failures),
+        },
+        "loop_audit": loop_audit.offenders if loop_audit else None,
+        "entities": dict(entities),
+    }
@@ -0,0 +1,282 @@
+"""Modbus TCP transport for ATREA units."""
+
+import asyncio
+import struct
+import time
+from collections.abc import Iterable
+
+from aiohttp import ClientSession
+from pyatrea import Atrea
+
+from .api import AtreaClient, _timed
+from .const import (
+    LOGGER,
+    MODBUS_BACKOFF,
+    MODBUS_MAX_FAILURES,
+    MODBUS_MAX_GAP,
+    MODBUS_TIMEOUT,
+    MODBUS_UNIT_ID,
+)
+
+# Function codes reading each register type, their IDs start with the letter
+READ_FUNCTIONS = {"C": 1, "D": 2, "H": 3, "I": 4}
+READ_PREFIXES = {function: prefix for prefix, function in READ_FUNCTIONS.items()}
+# Most registers or bits a single read may request
+READ_LIMITS = {1: 2000, 2: 2000, 3: 125, 4: 125}
+WRITE_COIL = 5
+WRITE_REGISTER = 6
+WRITE_REGISTERS = 16
+
+
+class ModbusError(Exception):
+    """The unit answered a request with a Modbus exception code."""
+
+
+# Errors of the Modbus transport after which the web interface is used
+MODBUS_ERRORS = (OSError, TimeoutError, asyncio.IncompleteReadError, ModbusError)
+
+
+def plan_blocks(
+    registers: Iterable[str], max_gap: int = MODBUS_MAX_GAP
+) -> list[tuple[int, int, int]]:
+    """Group register IDs into ``(function, start, count)`` block reads.
+
+    Addresses are the numeric part of the ID. Registers of one type at most
+    ``max_gap`` addresses apart share a block up to the read limit.
+    """
+    addresses: dict[int, list[int]] = {}
+    for register in registers:
+        function = READ_FUNCTIONS.get(register[:1])
+        if function is not None and register[1:].isdigit():
+            addresses.setdefault(function, []).append(int(register[1:]))
+
+    blocks = []
+    for function, values in sorted(addresses.items()):
+        start = end = None
+        for address in sorted(set(values)):
+            if (
+                start is not None
+                and address - end <= max_gap + 1
+                and address - start < READ_LIMITS[function]
+            ):
+                end = address
+                continue
+            if start is not None:
+                blocks.append((function, start, end - start + 1))
+            start = end = address
+        if start is not None:
+            blocks.append((function, start, end - start + 1))
+    return blocks
+
+
+class AtreaModbusClient(AtreaClient):
+    """Client polling status registers and sending commands over Modbus TCP.
+
+    Params, translations and sign-in are only served by the web interface,
+    and so is the first status read. It tells which registers the unit has.
+    Later polls read those in the query plan in contiguous blocks, and fall
+    back to the web interface for a poll when Modbus fails or exceeds
+    ``MODBUS_TIMEOUT``. After ``MODBUS_MAX_FAILURES`` failures in a row
+    polls and commands use the web interface for ``MODBUS_BACKOFF``.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        atrea: Atrea,
+        code_listener=None,
+        modbus_port: int = 502,
+    ) -> None:
+        super().__init__(session, atrea, code_listener)
+        self.modbus_port = modbus_port
+        self._lock = asyncio.Lock()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._transaction = 0
+        # registers reported by the web interface and their zero padding
+        self._registers: set[str] = set()
+        self._widths: dict[str, int] = {}
+        self._blocks: tuple[frozenset[str], list[tuple[int, int, int]]] | None = None
+        self._failures = 0
+        self._paused_until = 0.0
+
+    async def async_close(self) -> None:
+        """Close the Modbus connection."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _async_request(self, pdu: bytes) -> bytes:
+        """Send one request PDU and return the response PDU."""
+        async with self._lock, asyncio.timeout(MODBUS_TIMEOUT):
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(
+                    self.atrea.ip, self.modbus_port
+                )
+            self._transaction = (self._transaction + 1) & 0xFFFF
+            try:
+                self._writer.write(
+                    struct.pack(
+                        ">HHHB", self._transaction, 0, len(pdu) + 1, MODBUS_UNIT_ID
+                    )
+                    + pdu
+                )
+                header = await self._reader.readexactly(7)
+                transaction, _, length, _ = struct.unpack(">HHHB", header)
+                response = await self._reader.readexactly(length - 1)
+            except BaseException:
+                # a half read response would be taken for the next one
+                await self.async_close()
+                raise
+            if transaction != self._transaction:
+                await self.async_close()
+                raise ModbusError(f"unexpected transaction {transaction}")
+        if response[0] & 0x80:
+            raise ModbusError(f"exception code {response[1]}")
+        return response
+
+    async def _async_read_block(
+        self, function: int, start: int, count: int
+    ) -> list[int]:
+        """Read a block of registers or bits."""
+        response = await self._async_request(
+            struct.pack(">BHH", function, start, count)
+        )
+        data = response[2 : 2 + response[1]]
+        if function in (1, 2):
+            return [data[index // 8] >> (index % 8) & 1 for index in range(count)]
+        return list(struct.unpack(f">{count}H", data))
+
+    def _modbus_paused(self) -> bool:
+        """Return whether Modbus is left alone after repeated failures."""
+        return time.monotonic() < self._paused_until
+
+    def _modbus_failed(self, operation: str, err: Exception) -> None:
+        """Note a Modbus failure, pausing Modbus after too many in a row."""
+        self._note_failure(operation, f"modbus {err!r}")
+        self._failures += 1
+        if self._failures >= MODBUS_MAX_FAILURES:
+            LOGGER.warning(
+                "[%s] Atrea Modbus failed %d times, using the web interface for %s",
+                self.atrea.ip,
+                self._failures,
+                MODBUS_BACKOFF,
+            )
+            self._failures = 0
+            self._paused_until = time.monotonic() + MODBUS_BACKOFF.total_seconds()
+
+    @_timed("status")
+    async def async_get_status(self) -> dict | bool:
+        """Read the planned registers, the web interface until they are known."""
+        if not self._registers or self._modbus_paused():
+            return await self._async_get_web_status()
+
+        wanted = self._registers
+        if self.query_plan is not None:
+            wanted = self._registers & self.query_plan
+        wanted = frozenset(wanted)
+        if self._blocks is None or self._blocks[0] != wanted:
+            self._blocks = (wanted, plan_blocks(wanted))
+
+        status = {}
+        try:
+            async with asyncio.timeout(MODBUS_TIMEOUT):
+                for function, start, count in self._blocks[1]:
+                    prefix = READ_PREFIXES[function]
+                    values = await self._async_read_block(function, start, count)
+                    for address, value in enumerate(values, start):
+                        register = f"{prefix}{address:05}"
+                        if register in wanted:
+                            status[register] = str(value).zfill(
+                                self._widths.get(register, 0)
+                            )
+        except MODBUS_ERRORS as err:
+            LOGGER.debug("Atrea Modbus read failed, using the web interface: %r", err)
+            self._modbus_failed("status", err)
+            return await self._async_get_web_status()
+        self._failures = 0
+        self.atrea.status = status
+        return status
+
+    async def _async_get_web_status(self) -> dict | bool:
+        """Read the status from the web interface and learn its registers."""
+        status = await self._async_get_xml_status()
+        if status:
+            self._registers.update(status)
+            self._widths.update(
+                (register, len(value))
+                for register, value in status.items()
+                if len(value) > 1 and value[0] == "0"
+            )
+        return status
+
+    @_timed("exec")
+    async def async_exec(self, commands: dict[str, str] | None = None) -> bool:
+        """Write the given commands, by default those queued on pyatrea."""
+        if commands is None:
+            commands = self.atrea.commands
+        if not commands:
+            return False
+        return await self._async_write(commands)
+
+    @_timed("exec")
+    async def async_execute_one_shot_command(
+        self, register: str, value: int = 1
+    ) -> bool:
+        """Write one register without touching the queued commands."""
+        if (
+            not isinstance(register, str)
+            or len(register) != 6
+            or register[0] not in "CH"
+            or not register[1:].isdigit()
+            or not isinstance(value, int)
+            or not 0 <= value <= 65535
+        ):
+            return False
+        return await self._async_write({register: f"{value:05}"})
+
+    async def _async_write(self, commands: dict[str, str]) -> bool:
+        """Write coils one by one and holding registers in contiguous runs.
+
+        The web interface takes the commands when Modbus fails or is paused.
+        """
+        if any(register[0] not in "CH" for register in commands):
+            return False
+        if self._modbus_paused():
+            return await self._async_write_xml(commands)
+        try:
+            registers = sorted(
+                (int(register[1:]), int(value) & 0xFFFF)
+                for register, value in commands.items()
+                if register[0] == "H"
+            )
+            for register, value in commands.items():
+                if register[0] == "C":
+                    coil = 0xFF00 if int(value) else 0
+                    await self._async_request(
+                        struct.pack(">BHH", WRITE_COIL, int(register[1:]), coil)
+                    )
+            while registers:
+                run = [registers.pop(0)]
+                while registers and registers[0][0] == run[-1][0] + 1:
+                    run.append(registers.pop(0))
+                start = run[0][0]
+                values = [value for _, value in run]
+                if len(run) == 1:
+                    pdu = struct.pack(">BHH", WRITE_REGISTER, start, values[0])
+                else:
+                    pdu = struct.pack(
+                        f">BHHB{len(values)}H",
+                        WRITE_REGISTERS,
+                        start,
+                        len(values),
+                        len(values) * 2,
+                        *values,
+                    )
+                await self._async_request(pdu)
+        except MODBUS_ERRORS as err:
+            LOGGER.debug("Atrea Modbus write failed, using the web interface: %r", err)
+            self._modbus_failed("exec", err)
+            return await self._async_write_xml(commands)
+        self._failures = 0
+        return True
@@ -0,0 +1,83 @@
+"""Registers kept from each status poll."""
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_IP_ADDRESS
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import slugify
+
+from .binary_sensor import BINARY_SENSOR_REGISTERS
+from .climate import CLIMATE_REGISTERS
+from .const import DEFROST_REGISTER, DOMAIN, FIRMWARE_INSTALL_REGISTER
+from .sensor import CONSTANT_FLOW_REGISTER, SENSOR_REGISTERS
+
+# Registers pyatrea reads from the cached status: unit ID, firmware versions,
+# model, mode tables and the registers its command builders check.
+PYATREA_REGISTERS = frozenset(
+    {f"H12{index}" for index in range(300, 310)}
+    | {
+        "I00020",
+        "I00021",
+        "I00022",
+        "I10007",
+        "I10008",
+        "I10009",
+        "I12004",
+        "H11700",
+        "H10520",
+        "H10521",
+        "H10522",
+        "H10006",
+        "H10700",
+        "H10701",
+        "H10702",
+        "H10703",
+        "H10705",
+        "H10708",
+        "H10709",
+        "H10710",
+        "H10712",
+        "H01000",
+        "H01015",
+        "H01016",
+        "H01017",
+        "H01019",
+        "H01020",
+        "H01021",
+    }
+)
+# Registers the coordinator adapts the poll interval to
+COORDINATOR_REGISTERS = frozenset(
+    {DEFROST_REGISTER, FIRMWARE_INSTALL_REGISTER, CONSTANT_FLOW_REGISTER}
+)
+
+
+@callback
+def async_build_query_plan(
+    hass: HomeAssistant, entry: ConfigEntry, params: dict
+) -> frozenset[str]:
+    """Return the registers read by the enabled entities of an entry.
+
+    Registers of entities disabled in the entity registry are left out, those
+    of entities not registered yet are kept so they can still be discovered.
+    Warning and alert codes are always kept for the condition buttons.
+    """
+    registry = er.async_get(hass)
+    device_unique_id = slugify(f"atrea_{entry.data.get(CONF_IP_ADDRESS)}")
+
+    def enabled(domain: str, unique_id: str) -> bool:
+        entity_id = registry.async_get_entity_id(domain, DOMAIN, unique_id)
+        return entity_id is None or not registry.async_get(entity_id).disabled
+
+    plan = set(PYATREA_REGISTERS | COORDINATOR_REGISTERS)
+    plan.update((params or {}).get("warning", []))
+    plan.update((params or {}).get("alert", []))
+    if enabled("climate", device_unique_id):
+        plan |= CLIMATE_REGISTERS
+    for register, description in SENSOR_REGISTERS.items():
+        if enabled("sensor", slugify(f"{device_unique_id}_{description['key']}")):
+            plan.add(register)
+    for register in BINARY_SENSOR_REGISTERS:
+        if enabled("binary_sensor", slugify(f"{device_unique_id}_{register}")):
+            plan.add(register)
+    return frozenset(plan)
@@ -1,5 +1,6 @@
 """Sensors for ATREA analog inputs and outputs."""
 
+import time
 from collections.abc import Callable
 
 from homeassistant.components.sensor import (
@@ -14,16 +15,18 @@ from homeassistant.const import (
     PERCENTAGE,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
-from .const import DOMAIN
-from .utils import convert_temperature
+from .const import DOMAIN, SENSOR_HEARTBEAT
 
+CONSTANT_FLOW_REGISTER = "H10510"
 VOLT = "V"
 VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR = "m³/h"
 
+# A "deadband" skips state writes until the value moves at least that far from
+# the last written one, or "heartbeat" (default SENSOR_HEARTBEAT) has passed.
 SENSOR_REGISTERS = {
     "I10211": {
         "key": "outdoor_air_temperature",
@@ -31,7 +34,7 @@ SENSOR_REGISTERS = {
         "unit": UnitOfTemperature.CELSIUS,
         "device_class": SensorDeviceClass.TEMPERATURE,
         "display_precision": 1,
-        "convert": convert_temperature,
+        "deadband": 0.2,
     },
     "I10212": {
         "key": "supply_air_temperature",
@@ -39,7 +42,7 @@ SENSOR_REGISTERS = {
         "unit": UnitOfTemperature.CELSIUS,
         "device_class": SensorDeviceClass.TEMPERATURE,
         "display_precision": 1,
-        "convert": convert_temperature,
+        "deadband": 0.2,
     },
     "I10213": {
         "key": "extract_air_temperature",
@@ -47,7 +50,7 @@ SENSOR_REGISTERS = {
         "unit": UnitOfTemperature.CELSIUS,
         "device_class": SensorDeviceClass.TEMPERATURE,
         "display_precision": 1,
-        "convert": convert_temperature,
+        "deadband": 0.2,
     },
     "I10214": {
         "key": "exhaust_air_temperature",
@@ -55,7 +58,7 @@ SENSOR_REGISTERS = {
         "unit": UnitOfTemperature.CELSIUS,
         "device_class": SensorDeviceClass.TEMPERATURE,
         "display_precision": 1,
-        "convert": convert_temperature,
+        "deadband": 0.2,
     },
     "I10215": {
         "key": "indoor_air_temperature",
@@ -63,7 +66,7 @@ SENSOR_REGISTERS = {
         "unit": UnitOfTemperature.CELSIUS,
         "device_class": SensorDeviceClass.TEMPERATURE,
         "display_precision": 1,
-        "convert": convert_temperature,
+        "deadband": 0.2,
     },
     "I11420": {
         "key": "average_outdoor_air_temperature",
@@ -71,7 +74,7 @@ SENSOR_REGISTERS = {
         "unit": UnitOfTemperature.CELSIUS,
         "device_class": SensorDeviceClass.TEMPERATURE,
         "display_precision": 1,
-        "convert": convert_temperature,
+        "deadband": 0.2,
     },
     "I10205": {
         "key": "in1_voltage",
@@ -79,7 +82,7 @@ SENSOR_REGISTERS = {
         "unit": VOLT,
         "device_class": SensorDeviceClass.VOLTAGE,
         "display_precision": 3,
-        "convert": lambda value: int(value) / 1000,
+        "deadband": 0.05,
     },
     "I10206": {
         "key": "in2_voltage",
@@ -87,62 +90,61 @@ SENSOR_REGISTERS = {
         "unit": VOLT,
         "device_class": SensorDeviceClass.VOLTAGE,
         "display_precision": 3,
-        "convert": lambda value: int(value) / 1000,
+        "deadband": 0.05,
     },
     "H10202": {
         "key": "sa1_output",
         "name": "SA1 output",
         "unit": PERCENTAGE,
         "device_class": None,
-        "convert": lambda value: int(value) * 10,
     },
     "I11600": {
         "key": "supply_requested_airflow",
         "name": "Supply requested airflow",
         "unit": VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR,
         "device_class": None,
-        "convert": int,
         "constant_flow_only": True,
+        "deadband": 5,
     },
     "I11602": {
         "key": "supply_actual_airflow",
         "name": "Supply actual airflow",
         "unit": VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR,
         "device_class": None,
-        "convert": int,
         "constant_flow_only": True,
+        "deadband": 5,
     },
     "I11601": {
         "key": "extract_requested_airflow",
         "name": "Extract requested airflow",
         "unit": VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR,
         "device_class": None,
-        "convert": int,
         "constant_flow_only": True,
+        "deadband": 5,
     },
     "I11603": {
         "key": "extract_actual_airflow",
         "name": "Extract actual airflow",
         "unit": VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR,
         "device_class": None,
-        "convert": int,
         "constant_flow_only": True,
+        "deadband": 5,
     },
     "I11604": {
         "key": "outdoor_requested_airflow",
         "name": "Outdoor requested airflow",
         "unit": VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR,
         "device_class": None,
-        "convert": int,
         "constant_flow_only": True,
+        "deadband": 5,
     },
     "I11605": {
         "key": "outdoor_actual_airflow",
         "name": "Outdoor actual airflow",
         "unit": VOLUME_FLOW_RATE_CUBIC_METERS_PER_HOUR,
         "device_class": None,
-        "convert": int,
         "constant_flow_only": True,
+        "deadband": 5,
     },
 }
 
@@ -156,18 +158,26 @@ async def async_setup_entry(
     data = hass.data[DOMAIN][entry.entry_id]
     coordinator = data["coordinator"]
     known_registers: set[str] = set()
+    fingerprint = None
 
     def async_discover_sensors() -> None:
-        status = data.get("status") or {}
+        nonlocal fingerprint
+        snapshot = data["snapshot"]
+        values = snapshot.values
+        # only a new register set or constant flow switching adds sensors
+        current = (snapshot.key_generation, values.get(CONSTANT_FLOW_REGISTER))
+        if current == fingerprint:
+            return
+        fingerprint = current
         entities = []
 
         for register, description in SENSOR_REGISTERS.items():
             if (
-                register not in status
+                register not in values
                 or register in known_registers
                 or (
                     description.get("constant_flow_only")
-                    and str(status.get("H10510")) != "1"
+                    and not values.get(CONSTANT_FLOW_REGISTER)
                 )
             ):
                 continue
@@ -196,12 +206,23 @@ class AtreaRegisterSensor(CoordinatorEntity, SensorEntity):
         register: str,
         description: dict,
     ) -> None:
-        super().__init__(data["coordinator"])
+        constant_flow_only = description.get("constant_flow_only", False)
+        super().__init__(
+            data["coordinator"],
+            frozenset({register, CONSTANT_FLOW_REGISTER})
+            if constant_flow_only
+            else frozenset({register}),
+        )
         self._data = data
         self._register = register
-        self._convert = description["convert"]
         self._display_precision = description.get("display_precision")
-        self._constant_flow_only = description.get("constant_flow_only", False)
+        self._constant_flow_only = constant_flow_only
+        self._deadband = description.get("deadband", 0)
+        self._heartbeat = description.get("heartbeat", SENSOR_HEARTBEAT).total_seconds()
+        # value and availability last written to the state
+        self._value = data["snapshot"].values.get(register)
+        self._available = None
+        self._written_at = time.monotonic()
 
         ip_address = entry.data.get(CONF_IP_ADDRESS)
         device_unique_id = slugify(f"atrea_{ip_address}")
@@ -224,22 +245,36 @@ class AtreaRegisterSensor(CoordinatorEntity, SensorEntity):
     @property
     def available(self) -> bool:
         """Report whether the register is present in the latest status."""
-        register_available = (
-            super().available
-            and self._register in (self._data.get("status") or {})
-        )
-        if not register_available:
-            return False
+        values = self._data["snapshot"].values
         return (
-            not self._constant_flow_only
-            or str((self._data.get("status") or {}).get("H10510")) == "1"
+            super().available
+            and self._register in values
+            and (not self._constant_flow_only or values.get(CONSTANT_FLOW_REGISTER))
         )
 
     @property
     def native_value(self):
-        """Return the converted register value."""
-        value = (self._data.get("status") or {}).get(self._register)
-        return None if value is None else self._convert(value)
+        """Return the register value last written to the state."""
+        return self._value
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state unless the value stayed within the deadband."""
+        value = self._data["snapshot"].values.get(self._register)
+        available = self.available
+        if (
+            value is not None
+            and self._value is not None
+            # decoded steps such as 15.2 - 15.0 come out just below 0.2
+            and round(abs(value - self._value), 6) < self._deadband
+            and available == self._available
+            and time.monotonic() - self._written_at < self._heartbeat
+        ):
+            return
+        self._value = value
+        self._available = available
+        self._written_at = time.monotonic()
+        super()._handle_coordinator_update()
 
     @property
     def extra_state_attributes(self) -> dict:
@@ -0,0 +1,220 @@
+"""Decoded view of one ATREA status poll shared by all platforms."""
+
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from pyatrea import Atrea, AtreaMode, AtreaProgram
+
+from .utils import convert_temperature
+
+
+def _volts(value) -> float:
+    return int(value) / 1000
+
+
+def _flag(value) -> bool:
+    return str(value) == "1"
+
+
+# Registers exposed as plain entity values and how to decode them.
+REGISTER_DECODERS: dict[str, Callable] = {
+    "I10211": convert_temperature,
+    "I10212": convert_temperature,
+    "I10213": convert_temperature,
+    "I10214": convert_temperature,
+    "I10215": convert_temperature,
+    "I11420": convert_temperature,
+    "I10205": _volts,
+    "I10206": _volts,
+    "H10202": lambda value: int(value) * 10,
+    "I11600": int,
+    "I11601": int,
+    "I11602": int,
+    "I11603": int,
+    "I11604": int,
+    "I11605": int,
+    "D10200": _flag,
+    "D10201": _flag,
+    "D10202": _flag,
+    "D10203": _flag,
+    "D10207": _flag,
+    "H10510": _flag,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class AtreaSnapshot:
+    """Immutable decoded state of the unit at one poll.
+
+    Temperatures and the requested values are None when the unit reports
+    none of their registers. ``key_generation`` is increased whenever the set
+    of reported registers differs from the previous snapshot. ``conditions``
+    holds the active ``(severity, code)`` warning and alert pairs, and the
+    raised and cleared sets the difference to the previous snapshot.
+    """
+
+    status: Mapping[str, str]
+    key_generation: int
+    values: Mapping[str, object]
+    outside_temp: float | None
+    inside_temp: float | None
+    supply_air_temp: float | None
+    exhaust_temp: float | None
+    extract_temp: float | None
+    requested_temp: float | None
+    requested_power: int | None
+    fan_power: int | None
+    current_power: int | None
+    heating: int
+    cooling: int
+    in1: int | None
+    in2: int | None
+    sa1: int | None
+    active_inputs: tuple[str, ...]
+    mode: AtreaMode | None
+    forced_mode: AtreaMode
+    program: AtreaProgram | None
+    ventilation_off: bool
+    warnings: tuple[str, ...]
+    alerts: tuple[str, ...]
+    conditions: frozenset[tuple[str, str]]
+    conditions_raised: frozenset[tuple[str, str]]
+    conditions_cleared: frozenset[tuple[str, str]]
+
+    @classmethod
+    def decode(
+        cls,
+        status: dict,
+        params: dict,
+        atrea: Atrea,
+        previous: "AtreaSnapshot | None" = None,
+    ) -> "AtreaSnapshot":
+        """Decode a status dict with the scaling from params.
+
+        Only the mode tables are read from ``atrea``, no request is made.
+        """
+        coefs = params.get("coefs", {}) if params else {}
+        offsets = params.get("offsets", {}) if params else {}
+
+        def scaled(register):
+            """Return a register scaled like pyatrea's getValue."""
+            if register not in status:
+                return None
+            value = int(status[register])
+            if register in offsets:
+                value -= offsets[register]
+            if register in coefs:
+                value /= coefs[register]
+            return value
+
+        def raw_int(register):
+            return int(status[register]) if register in status else None
+
+        values = {
+            register: decode(status[register])
+            for register, decode in REGISTER_DECODERS.items()
+            if register in status
+        }
+
+        outside_temp = values.get("I10211")
+        if outside_temp is None and "I00202" in status:
+            outside_temp = scaled("I00202")
+            if outside_temp == 126.0:
+                # sensor missing, older units then measure outside air on I00200
+                outside_temp = scaled("I00200") if scaled("H00511") == 1 else None
+
+        supply_air_temp = values.get("I10212")
+        if supply_air_temp is None:
+            supply_air_temp = scaled("I00200")
+
+        if "H10706" in status:
+            requested_temp = float(status["H10706"]) / 10
+        else:
+            requested_temp = scaled("H01006")
+
+        if "H10714" in status:
+            requested_power = int(status["H10714"])
+        elif "H01005" in status:
+            requested_power = int(scaled("H01005"))
+        else:
+            requested_power = None
+
+        if "H10705" in status:
+            mode = AtreaMode(scaled("H10705"))
+        elif "H01000" in status:
+            mode = (atrea.idsToModes or {}).get(scaled("H01000"))
+        else:
+            mode = None
+
+        warnings = tuple(
+            code
+            for code in (params or {}).get("warning", [])
+            if str(status.get(code)) == "1"
+        )
+        alerts = tuple(
+            code
+            for code in (params or {}).get("alert", [])
+            if str(status.get(code)) == "1"
+        )
+        conditions = frozenset(
+            [("warning", code) for code in warnings]
+            + [("alert", code) for code in alerts]
+        )
+        previous_conditions = previous.conditions if previous else frozenset()
+
+        key_generation = 0
+        if previous is not None:
+            key_generation = previous.key_generation
+            if previous.status.keys() != status.keys():
+                key_generation += 1
+
+        forced_modes = atrea.forcedModes or {}
+        forced_mode = forced_modes.get(scaled("H10712"), AtreaMode.OFF)
+
+        return cls(
+            status=MappingProxyType(dict(status)),
+            key_generation=key_generation,
+            values=MappingProxyType(values),
+            outside_temp=outside_temp,
+            inside_temp=values.get("I10215"),
+            supply_air_temp=supply_air_temp,
+            exhaust_temp=values.get("I10214"),
+            extract_temp=values.get("I10213"),
+            requested_temp=requested_temp,
+            requested_power=requested_power,
+            fan_power=int(scaled("H01001")) if "H01001" in status else None,
+            current_power=raw_int("H10704"),
+            heating=int(status.get("C10215", -1)),
+            cooling=int(status.get("C10216", -1)),
+            in1=raw_int("I10205"),
+            in2=raw_int("I10206"),
+            sa1=raw_int("H10202"),
+            active_inputs=tuple(
+                f"D{index + 1}"
+                for index in range(4)
+                if int(status.get(f"D1020{index}", 0))
+            ),
+            mode=mode,
+            forced_mode=forced_mode,
+            program=_decode_program(scaled("H10700"), scaled("H01015")),
+            ventilation_off=scaled("H10705") == 0,
+            warnings=warnings,
+            alerts=alerts,
+            conditions=conditions,
+            conditions_raised=conditions - previous_conditions,
+            conditions_cleared=previous_conditions - conditions,
+        )
+
+
+def _decode_program(program, legacy_program) -> AtreaProgram | None:
+    """Map the current or the legacy program register to a program."""
+    if program in (0, 1, 2):
+        return (AtreaProgram.MANUAL, AtreaProgram.WEEKLY, AtreaProgram.TEMPORARY)[
+            int(program)
+        ]
+    if legacy_program in (0, 1, 2):
+        return (AtreaProgram.WEEKLY, AtreaProgram.MANUAL, AtreaProgram.TEMPORARY)[
+            int(legacy_program)
+        ]
+    return None
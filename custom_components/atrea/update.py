@@ -1,12 +1,13 @@
-import logging
-import time
-from homeassistant.core import HomeAssistant
+from aiohttp import ClientError
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.config_entries import ConfigEntry
 from typing import Callable
 from homeassistant.components.update import UpdateEntity, UpdateEntityFeature
-from homeassistant.util import slugify, Throttle
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import slugify
 from homeassistant.const import CONF_IP_ADDRESS, CONF_NAME
-from .const import DOMAIN, MIN_TIME_BETWEEN_SCANS, UPDATE_DELAY, LOGGER
+from .const import DOMAIN, FIRMWARE_INSTALL_REGISTER
 
 
 async def async_setup_entry(
@@ -19,12 +20,11 @@ async def async_setup_entry(
     async_add_entities([hass.data[DOMAIN][entry.entry_id]["update"]])
 
 
-class AtreaUpdate(UpdateEntity):
+class AtreaUpdate(CoordinatorEntity, UpdateEntity):
     def __init__(self, hass, entry, sensor_name):
-        super().__init__()
-        self._coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-        self.updatePending = False
         self.data = hass.data[DOMAIN][entry.entry_id]
+        super().__init__(self.data["coordinator"])
+        self._firmware = self.data["firmwareCoordinator"]
         self.atrea = self.data["atrea"]
         self._in_progress = False
         self._enabled = False
@@ -33,9 +33,14 @@ class AtreaUpdate(UpdateEntity):
         self.manualUpdate(False)
 
     async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._firmware.async_add_listener(self._handle_coordinator_update)
+        )
         self._enabled = True
 
     async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
         self._enabled = False
 
     @property
@@ -60,10 +65,6 @@ class AtreaUpdate(UpdateEntity):
             "connections": {},
         }
 
-    @property
-    def should_poll(self):
-        return True
-
     @property
     def unique_id(self) -> str:
         return self.getUniqueID()
@@ -71,26 +72,23 @@ class AtreaUpdate(UpdateEntity):
     def getUniqueID(self):
         return slugify(f"atrea_{self.ip}")
 
-    @Throttle(MIN_TIME_BETWEEN_SCANS)
-    async def async_update(self):
-        if not self.updatePending:
-            self.updatePending = True
-            await self._coordinator.async_request_refresh()
-            await self.hass.async_add_executor_job(time.sleep, UPDATE_DELAY / 1000)
-            self.manualUpdate()
-            self.updatePending = False
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self.manualUpdate()
 
     def manualUpdate(self, updateState=True):
         status = self.data["status"]
-        self._in_progress = "I10005" in status and int(status["I10005"]) > 3
-        self._id = self.atrea.getID()
+        self._in_progress = (
+            FIRMWARE_INSTALL_REGISTER in status
+            and int(status[FIRMWARE_INSTALL_REGISTER]) > 3
+        )
+        firmware = self._firmware.data or {}
+        self._id = firmware.get("id")
         self._model = self.data["model"]
-        self._swVersion = self.atrea.getVersion()
-        self._latestVersion = self.atrea.getLatestVersion()
-        if self._latestVersion == "0.0":
-            self._latestVersion = self._swVersion
+        self._swVersion = firmware.get("installed")
+        self._latestVersion = firmware.get("latest")
         if updateState:
-            self.async_schedule_update_ha_state(True)
+            self.async_write_ha_state()
 
     @property
     def supported_features(self):
@@ -99,7 +97,7 @@ class AtreaUpdate(UpdateEntity):
     def updateName(self, name, updateState=True):
         self._name = name
         if updateState:
-            self.async_schedule_update_ha_state(True)
+            self.async_write_ha_state()
 
     @property
     def name(self) -> str:
@@ -125,8 +123,22 @@ class AtreaUpdate(UpdateEntity):
         self, version, backup,
     ):
         self._in_progress = True
-        self.atrea.prepareUpdate()
-        await self.hass.async_add_executor_job(self.atrea.exec)
-        await self._coordinator.async_request_refresh()
-        self.manualUpdate()
+        self.async_write_ha_state()
+        # pyatrea's prepareUpdate would stage this in the queue shared with
+        # the climate entity, where it stays after the exec
+        try:
+            accepted = await self.data["client"].async_execute_one_shot_command(
+                "H10006", 1
+            )
+        except (TimeoutError, ClientError) as err:
+            self._in_progress = False
+            self.async_write_ha_state()
+            raise HomeAssistantError("Atrea did not respond to the update") from err
+        if not accepted:
+            self._in_progress = False
+            self.async_write_ha_state()
+            raise HomeAssistantError("Atrea did not accept the update")
+        self.coordinator.async_note_command()
+        await self.coordinator.async_request_refresh()
+        await self._firmware.async_request_refresh()
 
@@ -6,6 +6,16 @@ from .const import (
     ALL_PRESET_LIST,
     CONF_FAN_MODES,
     DEFAULT_FAN_MODE_LIST,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    CONF_COMMAND_DEBOUNCE,
+    DEFAULT_COMMAND_DEBOUNCE,
+    CONF_TRANSPORT,
+    DEFAULT_TRANSPORT,
+    CONF_MODBUS_PORT,
+    DEFAULT_MODBUS_PORT,
 )
 from homeassistant.const import CONF_NAME
 
@@ -18,9 +28,68 @@ def convert_temperature(value):
     return value / 10
 
 
-def isAtreaUnit(host, port):
-    atrea = Atrea(host, port)
-    return atrea.isAtreaUnit()
+def getTranslation(atrea, id):
+    """Translate a parameter ID, never downloading translations on the loop.
+
+    pyatrea downloads the translations again whenever they are missing, so
+    return the ID itself when loading them failed during setup.
+    """
+    translations = atrea.translations
+    if not translations["params"] or not translations["words"]:
+        return id
+    return atrea.getTranslation(id)
+
+
+def getSupportedModes(atrea):
+    """Return writable and forced modes, both parsed from lang/userCtrl.xml."""
+    return atrea.getSupportedModes(), atrea.getSupportedForcedModes()
+
+
+def reloadSupportedModes(atrea):
+    """Reload writable and forced modes, keeping the current ones on failure.
+
+    pyatrea clears its mode tables before downloading, so load into a scratch
+    object sharing the session and swap the tables in only when both succeed.
+    """
+    scratch = Atrea(atrea.ip, atrea.port, atrea.password, atrea.code)
+    scratch.status = atrea.status
+    if not scratch.loadSupportedModes() or not scratch.loadSupportedForcedModes():
+        return False
+    atrea.writable_modes = scratch.writable_modes
+    atrea.modesToIds = scratch.modesToIds
+    atrea.idsToModes = scratch.idsToModes
+    atrea.forcedModes = scratch.forcedModes
+    return True
+
+
+def reloadConfiguration(atrea):
+    """Reload translations, config directory and model.
+
+    pyatrea downloads these only while they are missing, so load them into a
+    scratch object sharing the session and swap in what loaded. Return the
+    config directory and model, or False when the config directory failed.
+    """
+    scratch = Atrea(atrea.ip, atrea.port, atrea.password, atrea.code)
+    scratch.status = atrea.status
+    translations = scratch.getTranslations()
+    if translations["params"] and translations["words"]:
+        atrea.translations = translations
+    configDir = scratch.getConfigDir()
+    if configDir is False:
+        return False
+    atrea.configDir = configDir
+    return configDir, scratch.getModel()
+
+
+def readFirmware(atrea):
+    """Return the unit ID with the installed and latest firmware versions."""
+    installed = atrea.getVersion()
+    latest = atrea.getLatestVersion()
+    return {
+        "id": atrea.getID(),
+        "installed": installed,
+        "latest": installed if latest == "0.0" else latest,
+    }
 
 
 def processFanModes(fan_modes):
@@ -41,6 +110,14 @@ def processFanModes(fan_modes):
 
 
 async def update_listener(hass, entry):
+    transport = (
+        entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT),
+        entry.data.get(CONF_MODBUS_PORT, DEFAULT_MODBUS_PORT),
+    )
+    if transport != hass.data[DOMAIN][entry.entry_id]["transport"]:
+        # the client is created with its transport, set up again
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
     preset_list = entry.data.get(CONF_PRESETS)
     if preset_list is None:
         preset_list = ALL_PRESET_LIST
@@ -53,4 +130,11 @@ async def update_listener(hass, entry):
     hass.data[DOMAIN][entry.entry_id]["climate"].updatePresetList(preset_list)
     hass.data[DOMAIN][entry.entry_id]["climate"].updateFanList(fan_list)
     hass.data[DOMAIN][entry.entry_id]["climate"].updateName(sensor_name)
+    hass.data[DOMAIN][entry.entry_id]["climate"].updateCommandDebounce(
+        entry.data.get(CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE)
+    )
     hass.data[DOMAIN][entry.entry_id]["update"].updateName(sensor_name)
+    hass.data[DOMAIN][entry.entry_id]["coordinator"].async_set_interval_limits(
+        entry.data.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL),
+        entry.data.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+    )
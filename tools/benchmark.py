@@ -0,0 +1,241 @@
+"""Micro-benchmarks of the integration's per-poll code paths.
+
+Runs each path on synthetic status dicts, from a small unit to a full
+register map with hundreds of warning codes::
+
+    python tools/benchmark.py --compare
+    python tools/benchmark.py --save
+
+Without a path both use the reference baseline ``benchmark_baseline.json``
+next to this script, which also records the machine it was measured on.
+Timings only compare on the same machine, so store a local baseline before
+a change when running elsewhere. Comparing exits with status 1 when a path
+got slower than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyatrea import Atrea  # noqa: E402
+
+from custom_components.atrea import binary_sensor, button, sensor  # noqa: E402
+from custom_components.atrea.climate import AtreaDevice  # noqa: E402
+from custom_components.atrea.const import (  # noqa: E402
+    ALL_PRESET_LIST,
+    DEFAULT_FAN_MODE_LIST,
+    DOMAIN,
+)
+from custom_components.atrea.snapshot import AtreaSnapshot  # noqa: E402
+from custom_components.atrea.utils import (  # noqa: E402
+    convert_temperature,
+    processFanModes,
+)
+from emulator import ALERT_CODES, CONSTANT_FLOW, RD5_BASE  # noqa: E402
+
+ENTRY_ID = "benchmark"
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+
+
+class _Coordinator:
+    """Stand-in coordinator keeping the discovery listeners."""
+
+    last_update_success = True
+
+    def __init__(self) -> None:
+        self.listeners = []
+
+    def async_add_listener(self, update_callback, context=None):
+        self.listeners.append(update_callback)
+        return lambda: None
+
+
+def make_scenario(warnings: int, extra_registers: int, active: int) -> dict:
+    """Return entry data for a unit with the given register counts."""
+    status = {**RD5_BASE, **CONSTANT_FLOW}
+    status.update({f"H13{index:03}": "0" for index in range(extra_registers)})
+    warning_codes = [f"D12{index:03}" for index in range(warnings)]
+    status.update({code: "0" for code in warning_codes})
+    for code in warning_codes[:active]:
+        status[code] = "1"
+    status[ALERT_CODES[0]] = "1" if active else "0"
+    params = {
+        "ids": list(status),
+        "warning": warning_codes,
+        "alert": list(ALERT_CODES),
+        "coefs": {},
+        "offsets": {},
+    }
+
+    atrea = Atrea("127.0.0.1")
+    atrea.status = status
+    atrea.params = params
+    atrea.forcedModes = {}
+    atrea.writable_modes = {index: True for index in range(len(ALL_PRESET_LIST))}
+    # non-empty tables keep getTranslation from downloading them
+    atrea.translations = {"params": {"-": "-"}, "words": {"-": "-"}}
+
+    return {
+        "atrea": atrea,
+        "client": None,
+        "coordinator": _Coordinator(),
+        "firmwareCoordinator": SimpleNamespace(data={}),
+        "supportedModes": atrea.writable_modes.items(),
+        "supportedForcedModes": {}.items(),
+        "userLabels": {},
+        "status": status,
+        "params": params,
+        "descriptionsLoaded": True,
+        "snapshot": AtreaSnapshot.decode(status, params, atrea),
+        "model": {},
+    }
+
+
+def make_benchmarks(data: dict) -> dict:
+    """Return the callables to time for one scenario."""
+    hass = SimpleNamespace(data={DOMAIN: {ENTRY_ID: data}})
+    entry = SimpleNamespace(
+        entry_id=ENTRY_ID,
+        data={"ip_address": "127.0.0.1", "name": "atrea"},
+        async_on_unload=lambda remove: None,
+    )
+    added = []
+    for platform in (sensor, binary_sensor, button):
+        coroutine = platform.async_setup_entry(hass, entry, added.extend)
+        try:
+            coroutine.send(None)
+        except StopIteration:
+            pass
+    listeners = data["coordinator"].listeners
+
+    presets = {preset: True for preset in ALL_PRESET_LIST}
+    climate = AtreaDevice(hass, entry, "atrea", DEFAULT_FAN_MODE_LIST, presets, 500)
+    sensors = [
+        entity for entity in added if isinstance(entity, sensor.AtreaRegisterSensor)
+    ]
+    buttons = [
+        entity for entity in added if isinstance(entity, button.AtreaConditionButton)
+    ]
+    status, params, atrea = data["status"], data["params"], data["atrea"]
+
+    def discovery():
+        for listener in listeners:
+            listener()
+
+    return {
+        "snapshot_decode": lambda: AtreaSnapshot.decode(status, params, atrea),
+        "climate_manual_update": lambda: climate.manualUpdate(False),
+        "sensor_native_value": lambda: [entity.native_value for entity in sensors],
+        "condition_membership": lambda: [
+            (entity._severity, entity._code) in data["snapshot"].conditions
+            for entity in buttons
+        ],
+        "discovery_listeners": discovery,
+        "convert_temperature": lambda: convert_temperature("65500"),
+        "process_fan_modes": lambda: processFanModes(DEFAULT_FAN_MODE_LIST),
+    }
+
+
+SCENARIOS = {
+    "small": (1, 0, 0),
+    "medium": (50, 100, 5),
+    "full": (400, 600, 40),
+}
+
+
+def run(number: int, repeat: int) -> dict[str, float]:
+    """Return the best time per call in microseconds of every benchmark."""
+    results = {}
+    for scenario, sizes in SCENARIOS.items():
+        for name, target in make_benchmarks(make_scenario(*sizes)).items():
+            best = min(timeit.repeat(target, number=number, repeat=repeat))
+            results[f"{scenario}/{name}"] = best / number * 1e6
+    return results
+
+
+def machine_info() -> dict:
+    """Describe the machine and interpreter the timings were taken on."""
+    processor = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("model name"):
+                    processor = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {
+        "processor": processor,
+        "cpus": os.cpu_count(),
+        "system": platform.system(),
+        "python": platform.python_version(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, help="calls per round, 1000")
+    parser.add_argument("--repeat", type=int, help="rounds, best is kept, 5")
+    parser.add_argument(
+        "--save", metavar="PATH", nargs="?", const=BASELINE, help="store a baseline"
+    )
+    parser.add_argument(
+        "--compare", metavar="PATH", nargs="?", const=BASELINE, help="compare to one"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 is 20 %%"
+    )
+    args = parser.parse_args()
+
+    machine = machine_info()
+    # rounds and calls of the baseline unless given, best times depend on them
+    settings = {"number": 1000, "repeat": 5}
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            stored = json.load(file)
+        baseline = stored["results"]
+        settings.update(stored["settings"])
+        if stored["machine"] != machine:
+            print(f"Baseline was measured on {stored['machine']}, not {machine}.")
+    if args.number is not None:
+        settings["number"] = args.number
+    if args.repeat is not None:
+        settings["repeat"] = args.repeat
+
+    results = run(settings["number"], settings["repeat"])
+
+    regressions = []
+    for name, value in results.items():
+        line = f"{name:40} {value:10.2f} us"
+        if name in baseline:
+            change = value / baseline[name] - 1
+            line += f" {change:+8.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(
+                {"machine": machine, "settings": settings, "results": results},
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+            file.write("\n")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
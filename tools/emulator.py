@@ -0,0 +1,505 @@
+"""Local emulator of the ATREA web server XML API.
+
+Serves the endpoints used by pyatrea and the integration so polling and
+commands can be exercised without hardware::
+
+    python tools/emulator.py --model rd5-cf --port 8080 --latency 0.05
+
+Then add the integration with host ``127.0.0.1`` and port ``8080``. With
+``--modbus-port`` the unit also answers Modbus TCP register reads and writes.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import struct
+import time
+from dataclasses import dataclass, field
+from urllib.parse import quote
+
+from aiohttp import web
+
+FORBIDDEN = "HTTP: 403 Forbidden"
+COMMAND = re.compile(r"^([A-Z]\d{5})(\d{5})$")
+
+FILTER_WARNING = "D11183"
+ALERT_CODES = ("D11184", "D11185")
+DEFROST_REGISTER = "D10207"
+# Modbus function codes reading each register type
+MODBUS_READS = {1: "C", 2: "D", 3: "H", 4: "I"}
+
+# Temperatures of the RD5 registers are signed tenths of a degree.
+RD5_BASE = {
+    "I00020": "2",
+    "I00021": "01",
+    "I00022": "32",
+    "I10007": "2",
+    "I10008": "01",
+    "I10009": "32",
+    "I10005": "0",
+    "H10520": "1",
+    "H10521": "1",
+    "H10522": "1",
+    "I10211": str(65536 - 35),
+    "I10212": "195",
+    "I10213": "225",
+    "I10214": "40",
+    "I10215": "221",
+    "I11420": "12",
+    "I10205": "2500",
+    "I10206": "0",
+    "H10202": "0",
+    "H10700": "0",
+    "H10704": "50",
+    "H10705": "1",
+    "H10706": "210",
+    "H10712": "0",
+    "H10714": "50",
+    "I12004": "255",
+    "H11700": "1",
+    "C10215": "0",
+    "C10216": "0",
+    "D10200": "0",
+    "D10201": "0",
+    "D10202": "0",
+    "D10203": "0",
+    DEFROST_REGISTER: "0",
+    FILTER_WARNING: "0",
+    **{code: "0" for code in ALERT_CODES},
+    # unit ID "EMULATOR01" as ASCII codes in H12300..H12309
+    **{f"H12{300 + index}": str(ord(char)) for index, char in enumerate("EMULATOR01")},
+}
+
+CONSTANT_FLOW = {
+    "H10510": "1",
+    "I11600": "300",
+    "I11601": "300",
+    "I11602": "296",
+    "I11603": "303",
+    "I11604": "300",
+    "I11605": "298",
+}
+
+# Older web interfaces report scaled values with coefs from params.xml.
+LEGACY_BASE = {
+    "I00020": "1",
+    "I00021": "10",
+    "I00022": "0",
+    "I00200": "195",
+    "I00201": "40",
+    "I00202": "35",
+    "H00511": "1",
+    "H01000": "1",
+    "H01001": "50",
+    "H01005": "50",
+    "H01006": "210",
+    "H01015": "1",
+    FILTER_WARNING: "0",
+    **{code: "0" for code in ALERT_CODES},
+}
+LEGACY_COEFS = {
+    "I00200": 10,
+    "I00201": 10,
+    "I00202": 10,
+    "H01006": 10,
+    "H01021": 10,
+}
+
+# Writable setpoints and the status register showing their effect.
+SETPOINTS = {
+    "H10708": "H10714",
+    "H10709": "H10705",
+    "H10710": "H10706",
+    "H10700": "H10700",
+    "H10712": "H10712",
+    "H01019": "H01000",
+    "H01020": "H01005",
+    "H01021": "H01006",
+    "H01015": "H01015",
+}
+WRITE_ONLY = ("C10005", "C10007", "H10006")
+
+MODELS = {
+    "rd5": (RD5_BASE, {}),
+    "rd5-cf": ({**RD5_BASE, **CONSTANT_FLOW}, {}),
+    # R5 units without I12004 read their writable modes from userCtrl.xml
+    "r5": ({k: v for k, v in RD5_BASE.items() if k != "I12004"}, {}),
+    "r5-cf": (
+        {k: v for k, v in {**RD5_BASE, **CONSTANT_FLOW}.items() if k != "I12004"},
+        {},
+    ),
+    "legacy": (LEGACY_BASE, LEGACY_COEFS),
+}
+
+USER_CTRL = """<root><layout><options>
+<op id="ModeEC">
+<i id="0" title="$off"/><i id="1" title="$ventilation"/>
+<i id="2" title="$circulation"/><i id="3" title="$perVentilation"/>
+<i id="4" title="$nightBefCool"/><i id="5" title="D1" rw="0"/>
+</op>
+<op id="ModeText">
+<i id="0" title="$off"/><i id="1" title="$startUp"/><i id="2" title="$runDown"/>
+<i id="3" title="D1"/><i id="4" title="IN1"/><i id="5" title="$hpDefrosting"/>
+</op>
+</options></layout></root>"""
+
+CONFIG_DIR = """<root>
+<m id="01" name="Emulated"><c id="01" name="DUPLEX"><t id="01" name="EC 370"/></c></m>
+</root>"""
+
+
+@dataclass
+class EmulatorOptions:
+    """Behaviour of one emulated unit."""
+
+    model: str = "rd5"
+    password: str = ""
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    max_sessions: int = 3
+    session_ttl: float = 0.0
+    warnings: int = 0
+    alert: bool = False
+    defrost: bool = False
+    seed: int | None = None
+
+
+@dataclass
+class EmulatorStats:
+    """Request counters, useful when generating load."""
+
+    requests: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    logins: int = 0
+    commands: int = 0
+
+
+class AtreaEmulator:
+    """An emulated unit serving the ATREA XML endpoints."""
+
+    def __init__(self, options: EmulatorOptions | None = None) -> None:
+        self.options = options or EmulatorOptions()
+        base, coefs = MODELS[self.options.model]
+        self.legacy = self.options.model == "legacy"
+        self.status = dict(base)
+        self.coefs = dict(coefs)
+        self.warning_codes = [FILTER_WARNING] + [
+            f"D12{index:03}" for index in range(self.options.warnings)
+        ]
+        for code in self.warning_codes:
+            self.status.setdefault(code, "0")
+        self.sessions: dict[str, float] = {}
+        self.stats = EmulatorStats()
+        self._random = random.Random(self.options.seed)
+        self._started = time.monotonic()
+        self._runner: web.AppRunner | None = None
+        self._modbus: asyncio.Server | None = None
+        self._modbus_clients: set[asyncio.StreamWriter] = set()
+        self._ticker: asyncio.Task | None = None
+        if self.options.alert:
+            self.status[ALERT_CODES[0]] = "1"
+
+    def make_app(self) -> web.Application:
+        """Return the aiohttp application of the unit."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/config/login.cgi", self._login)
+        app.router.add_get("/config/xml.xml", self._status)
+        app.router.add_get("/config/xml.cgi", self._exec)
+        app.router.add_get("/user/params.xml", self._params)
+        app.router.add_get("/lang/texts_2.xml", self._translations)
+        app.router.add_get("/lang/userCtrl.xml", self._user_ctrl)
+        app.router.add_get("/config/texts.xml", self._user_labels)
+        app.router.add_get("/cfgdir.xml", self._config_dir)
+        app.router.add_get("/ver.txt", self._version)
+        return app
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Serve the unit and return the bound port."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self._ticker = asyncio.create_task(self._async_tick())
+        return self._runner.addresses[0][1]
+
+    async def async_start_modbus(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Serve Modbus TCP and return the bound port."""
+        self._modbus = await asyncio.start_server(self._async_modbus, host, port)
+        return self._modbus.sockets[0].getsockname()[1]
+
+    async def async_stop(self) -> None:
+        """Stop serving the unit."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+        if self._modbus is not None:
+            self._modbus.close()
+            for writer in self._modbus_clients:
+                writer.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Count requests and inject latency and server errors."""
+        self.stats.requests[request.path] = self.stats.requests.get(request.path, 0) + 1
+        delay = self.options.latency + self._random.uniform(0, self.options.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.options.error_rate:
+            self.stats.errors += 1
+            return web.Response(status=500, text="HTTP: 500 Internal Error")
+        return await handler(request)
+
+    def _authorized(self, request: web.Request) -> bool:
+        """Return whether the request carries a live session code."""
+        if self.legacy:
+            return True
+        started = self.sessions.get(request.query.get("auth", ""))
+        if started is None:
+            return False
+        ttl = self.options.session_ttl
+        if ttl and time.monotonic() - started > ttl:
+            del self.sessions[request.query["auth"]]
+            return False
+        return True
+
+    async def _login(self, request: web.Request) -> web.Response:
+        if self.legacy:
+            # root text is empty, the error is in a child like on the real unit
+            return _xml("<root><p>HTTP: 404 Page (/config/login.cgi)</p></root>")
+        expected = hashlib.md5(("\r\n" + self.options.password).encode()).hexdigest()
+        if request.query.get("magic") != expected:
+            return _xml("<root>denied</root>")
+        if len(self.sessions) >= self.options.max_sessions:
+            # the oldest signed-in user keeps the slot, like the real unit
+            return _xml("<root>denied</root>")
+        self.stats.logins += 1
+        code = f"{self._random.randrange(100000):05}"
+        self.sessions[code] = time.monotonic()
+        return _xml(f"<root>{code}</root>")
+
+    async def _status(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.Response(text=FORBIDDEN)
+        root = "PCOWEB><PCO" if self.legacy else "RD5WEB><RD5"
+        nodes = "".join(
+            f'<O I="{key}" V="{value}"/>' for key, value in self.status.items()
+        )
+        closing = "PCO></PCOWEB" if self.legacy else "RD5></RD5WEB"
+        return _xml(f"<{root}><INTEGERS>{nodes}</INTEGERS></{closing}>")
+
+    async def _exec(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.Response(text=FORBIDDEN)
+        for key in request.query:
+            match = COMMAND.match(key)
+            if match:
+                self.stats.commands += 1
+                self._apply(match[1], int(match[2]))
+        return _xml("<root>OK</root>")
+
+    def _apply(self, register: str, value: int) -> None:
+        """Apply a written register to the emulated status."""
+        if SETPOINTS.get(register) in self.status:
+            self.status[SETPOINTS[register]] = str(value)
+            if register == "H10708":
+                self.status["H10704"] = str(value)
+        elif register == "C10005":
+            for code in ALERT_CODES:
+                self.status[code] = "0"
+        elif register == "C10007":
+            self.status[FILTER_WARNING] = "0"
+        elif register == "H10006" and "I10005" in self.status:
+            self.status["I10005"] = "4"
+
+    async def _async_modbus(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer Modbus TCP requests of one connection."""
+        self._modbus_clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction, _, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                self.stats.requests["modbus"] = self.stats.requests.get("modbus", 0) + 1
+                delay = self.options.latency + self._random.uniform(
+                    0, self.options.jitter
+                )
+                if delay:
+                    await asyncio.sleep(delay)
+                response = self._modbus_response(pdu)
+                writer.write(
+                    struct.pack(">HHHB", transaction, 0, len(response) + 1, unit)
+                    + response
+                )
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._modbus_clients.discard(writer)
+            writer.close()
+
+    def _modbus_response(self, pdu: bytes) -> bytes:
+        """Return the response PDU, unknown addresses read as zero."""
+        function = pdu[0]
+        if function in MODBUS_READS:
+            start, count = struct.unpack(">HH", pdu[1:5])
+            if start + count > 65536:
+                return bytes((function | 0x80, 2))
+            prefix = MODBUS_READS[function]
+            values = [
+                int(self.status.get(f"{prefix}{address:05}", 0)) & 0xFFFF
+                for address in range(start, start + count)
+            ]
+            if function in (1, 2):
+                data = bytearray((count + 7) // 8)
+                for index, value in enumerate(values):
+                    if value:
+                        data[index // 8] |= 1 << (index % 8)
+                return bytes((function, len(data))) + bytes(data)
+            return bytes((function, count * 2)) + struct.pack(f">{count}H", *values)
+        if function == 5:
+            address, value = struct.unpack(">HH", pdu[1:5])
+            self.stats.commands += 1
+            self._apply(f"C{address:05}", int(value == 0xFF00))
+            return pdu[:5]
+        if function == 6:
+            address, value = struct.unpack(">HH", pdu[1:5])
+            self.stats.commands += 1
+            self._apply(f"H{address:05}", value)
+            return pdu[:5]
+        if function == 16:
+            start, count = struct.unpack(">HH", pdu[1:5])
+            values = struct.unpack(f">{count}H", pdu[6 : 6 + count * 2])
+            for address, value in enumerate(values, start):
+                self.stats.commands += 1
+                self._apply(f"H{address:05}", value)
+            return pdu[:5]
+        return bytes((function | 0x80, 1))
+
+    async def _params(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return web.Response(text=FORBIDDEN)
+        writable = [
+            key
+            for key in [*SETPOINTS, *WRITE_ONLY]
+            if key.startswith("H01") == self.legacy
+        ]
+        items = [
+            f'<i id="{key}"/>'
+            for key in dict.fromkeys([*self.status, *writable])
+            if key not in self.coefs
+        ]
+        items += [f'<i id="{key}" coef="{coef}"/>' for key, coef in self.coefs.items()]
+        items += [f'<i id="{code}" flag="W"/>' for code in self.warning_codes]
+        items += [f'<i id="{code}" flag="A"/>' for code in ALERT_CODES]
+        return _xml(f"<root><params>{''.join(items)}</params></root>")
+
+    async def _translations(self, request: web.Request) -> web.Response:
+        params = {code: {"t": quote(f"Warning {code}")} for code in self.warning_codes}
+        params[FILTER_WARNING] = {"t": quote("Filter change")}
+        params.update({code: {"t": quote(f"Alert {code}")} for code in ALERT_CODES})
+        words = {"ventilation": quote("Ventilation")}
+        return _xml(
+            f"<root><texts><params>{json.dumps(params)}</params>"
+            f"<words>{json.dumps(words)}</words></texts></root>"
+        )
+
+    async def _user_ctrl(self, request: web.Request) -> web.Response:
+        return _xml(USER_CTRL)
+
+    async def _user_labels(self, request: web.Request) -> web.Response:
+        return _xml('<root><texts><i id="D1" value="Bathroom"/></texts></root>')
+
+    async def _config_dir(self, request: web.Request) -> web.Response:
+        if self.legacy:
+            return web.Response(text="HTTP: 404 Page (/cfgdir.xml)")
+        return _xml(CONFIG_DIR)
+
+    async def _version(self, request: web.Request) -> web.Response:
+        return web.Response(text="010A00" if self.legacy else "020120")
+
+    async def _async_tick(self) -> None:
+        """Drift temperatures, run defrost cycles and finish installs."""
+        while True:
+            await asyncio.sleep(1)
+            elapsed = time.monotonic() - self._started
+            for register in ("I10212", "I10213", "I10215"):
+                if register in self.status:
+                    value = int(self.status[register]) + self._random.choice((-1, 0, 1))
+                    self.status[register] = str(value)
+            if self.options.defrost and DEFROST_REGISTER in self.status:
+                # five minute cycles with one minute of defrost
+                self.status[DEFROST_REGISTER] = "1" if elapsed % 300 < 60 else "0"
+            install = int(self.status.get("I10005", 0))
+            if install:
+                self.status["I10005"] = str((install + 1) % 10)
+
+
+def _xml(body: str) -> web.Response:
+    return web.Response(text=body, content_type="text/xml")
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    units = []
+    for index in range(args.units):
+        unit = AtreaEmulator(
+            EmulatorOptions(
+                model=args.model,
+                password=args.password,
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                max_sessions=args.max_sessions,
+                session_ttl=args.session_ttl,
+                warnings=args.warnings,
+                alert=args.alert,
+                defrost=args.defrost,
+                seed=None if args.seed is None else args.seed + index,
+            )
+        )
+        port = await unit.async_start(args.host, args.port + index if args.port else 0)
+        print(f"Emulated {args.model} unit listening on {args.host}:{port}")
+        if args.modbus_port:
+            modbus_port = await unit.async_start_modbus(
+                args.host, args.modbus_port + index
+            )
+            print(f"  Modbus TCP on {args.host}:{modbus_port}")
+        units.append(unit)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for unit in units:
+            await unit.async_stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add = parser.add_argument
+    add("--model", choices=sorted(MODELS), default="rd5")
+    add("--host", default="127.0.0.1")
+    add("--port", type=int, default=8080)
+    add("--units", type=int, default=1, help="units on consecutive ports")
+    add("--password", default="")
+    add("--latency", type=float, default=0.0, help="seconds per request")
+    add("--jitter", type=float, default=0.0, help="extra random seconds")
+    add("--error-rate", type=float, default=0.0, help="share of HTTP 500")
+    add("--max-sessions", type=int, default=3)
+    add("--session-ttl", type=float, default=0.0, help="0 never expires")
+    add("--warnings", type=int, default=0, help="extra warning codes")
+    add("--alert", action="store_true", help="start with an alert")
+    add("--defrost", action="store_true", help="cycle heat-pump defrost")
+    add("--modbus-port", type=int, default=0, help="also serve Modbus TCP")
+    add("--seed", type=int)
+    try:
+        asyncio.run(_async_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
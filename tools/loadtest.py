@@ -0,0 +1,208 @@
+"""Multi-unit load test of the integration in a local Home Assistant instance.
+
+Starts emulated units, sets each up through the regular config entry and
+platform setup, polls and sends random climate commands for a while and
+reports how the instance coped::
+
+    python tools/loadtest.py --units 10 --duration 120 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from homeassistant import bootstrap, config_entries, loader  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.atrea.const import (  # noqa: E402
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    DOMAIN,
+)
+from emulator import AtreaEmulator, EmulatorOptions  # noqa: E402
+
+LAG_PROBE_INTERVAL = 0.05
+
+
+def _percentiles(values: list[float]) -> str:
+    """Format p50, p95, p99 and max of samples in milliseconds."""
+    if len(values) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return "p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  max {:.1f} ms".format(
+        cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000, max(values) * 1000
+    )
+
+
+async def _async_start_hass(config_dir: str) -> HomeAssistant:
+    """Return a running instance with only the base functionality loaded."""
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    loader.async_setup(hass)
+    await bootstrap.async_load_base_functionality(hass)
+    await hass.async_start()
+    return hass
+
+
+async def _async_run(args: argparse.Namespace) -> None:
+    units = []
+    for index in range(args.units):
+        unit = AtreaEmulator(
+            EmulatorOptions(
+                model=args.model,
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                seed=index,
+            )
+        )
+        # unique IDs derive from the IP address, give every unit its own
+        host = f"127.0.0.{index + 2}"
+        units.append((unit, host, await unit.async_start(host)))
+
+    hass = await _async_start_hass(tempfile.mkdtemp(prefix="atrea-loadtest-"))
+    poll_times: list[float] = []
+    lags: list[float] = []
+    queue_depths: list[int] = []
+    state_changes = 0
+
+    def count_state_change(event) -> None:
+        nonlocal state_changes
+        state_changes += 1
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, count_state_change)
+
+    setup_started = time.monotonic()
+    entries = []
+    for _, host, port in units:
+        entry = config_entries.ConfigEntry(
+            version=2,
+            minor_version=1,
+            domain=DOMAIN,
+            title=f"{host}:{port}",
+            data={
+                "ip_address": host,
+                "port": port,
+                "password": "",
+                "name": f"Atrea {host}",
+                CONF_MIN_SCAN_INTERVAL: args.scan_interval,
+                CONF_MAX_SCAN_INTERVAL: args.scan_interval,
+            },
+            source=config_entries.SOURCE_USER,
+        )
+        await hass.config_entries.async_add(entry)
+        entries.append(entry)
+    await hass.async_block_till_done()
+    setup_duration = time.monotonic() - setup_started
+
+    climates = []
+    for entry in entries:
+        data = hass.data[DOMAIN].get(entry.entry_id)
+        if data is None:
+            print(f"Entry {entry.title} failed to set up: {entry.state}")
+            continue
+        coordinator = data["coordinator"]
+        update_method = coordinator.update_method
+
+        async def timed_update(update_method=update_method):
+            started = time.monotonic()
+            try:
+                return await update_method()
+            finally:
+                poll_times.append(time.monotonic() - started)
+
+        coordinator.update_method = timed_update
+        climates.append(data["climate"].entity_id)
+
+    async def probe_loop() -> None:
+        executor = None
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lags.append(time.monotonic() - started - LAG_PROBE_INTERVAL)
+            executor = executor or getattr(hass.loop, "_default_executor", None)
+            if executor is not None:
+                queue_depths.append(executor._work_queue.qsize())
+
+    async def command_loop() -> None:
+        rng = random.Random(0)
+        while climates:
+            await asyncio.sleep(rng.expovariate(args.commands_per_second))
+            entity_id = rng.choice(climates)
+            if rng.random() < 0.5:
+                service = "set_fan_mode"
+                data = {"fan_mode": rng.choice(("30%", "50%"))}
+            else:
+                service = "set_temperature"
+                data = {"temperature": rng.randint(18, 24)}
+            hass.async_create_task(
+                hass.services.async_call(
+                    "climate", service, {"entity_id": entity_id, **data}
+                )
+            )
+
+    tracemalloc.start()
+    memory_started = tracemalloc.get_traced_memory()[0]
+    state_changes = 0
+    tasks = [asyncio.create_task(probe_loop())]
+    if args.commands_per_second > 0:
+        tasks.append(asyncio.create_task(command_loop()))
+    await asyncio.sleep(args.duration)
+    for task in tasks:
+        task.cancel()
+    memory_growth = tracemalloc.get_traced_memory()[0] - memory_started
+    tracemalloc.stop()
+
+    print(
+        f"units set up             {len(climates)}/{len(units)}"
+        f" in {setup_duration:.2f} s"
+    )
+    print(f"polls                    {len(poll_times)}")
+    print(f"poll latency             {_percentiles(poll_times)}")
+    print(f"event loop lag           {_percentiles(lags)}")
+    print(
+        "executor queue depth     max {}  mean {:.2f}".format(
+            max(queue_depths, default=0),
+            statistics.fmean(queue_depths) if queue_depths else 0,
+        )
+    )
+    print(f"state changes per second {state_changes / args.duration:.2f}")
+    print(f"memory growth            {memory_growth / 1024:.0f} KiB")
+    print(
+        "emulator requests        {}".format(
+            sum(sum(unit.stats.requests.values()) for unit, _, _ in units)
+        )
+    )
+
+    await hass.async_stop()
+    for unit, _, _ in units:
+        await unit.async_stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add = parser.add_argument
+    add("--units", type=int, default=5)
+    add("--duration", type=float, default=60, help="seconds to run after setup")
+    add("--model", default="rd5-cf")
+    add("--scan-interval", type=int, default=5, help="seconds between polls")
+    add("--commands-per-second", type=float, default=0.5, help="0 disables")
+    add("--latency", type=float, default=0.0, help="emulated seconds per request")
+    add("--jitter", type=float, default=0.0)
+    add("--error-rate", type=float, default=0.0)
+    asyncio.run(_async_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
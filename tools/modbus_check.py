@@ -0,0 +1,182 @@
+"""Check the Modbus TCP transport against the emulated unit.
+
+Runs ``AtreaModbusClient`` against ``AtreaEmulator`` serving both the web
+interface and Modbus TCP, and exits with status 1 when a check fails::
+
+    python tools/modbus_check.py
+
+It checks the block planning, that bit and word reads match the XML
+status, coil and register writes, and the web interface fallback for a
+closed Modbus port and for one that accepts connections but never answers.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiohttp import ClientSession  # noqa: E402
+from pyatrea import Atrea  # noqa: E402
+
+from custom_components.atrea import modbus  # noqa: E402
+from custom_components.atrea.const import MODBUS_MAX_FAILURES  # noqa: E402
+from custom_components.atrea.modbus import AtreaModbusClient, plan_blocks  # noqa: E402
+from emulator import ALERT_CODES, AtreaEmulator, EmulatorOptions  # noqa: E402
+
+HOST = "127.0.0.1"
+# Shorter than the default so a silent port is detected quickly here
+MODBUS_TIMEOUT = 0.5
+
+failures: list[str] = []
+
+
+def check(condition: bool, message: str) -> None:
+    """Print the result of one check and remember failures."""
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def check_plan_blocks() -> None:
+    """Group registers by type, within the gap and the read limits."""
+    check(
+        plan_blocks(["I10211", "I10215", "I10230"], max_gap=8)
+        == [(4, 10211, 5), (4, 10230, 1)],
+        "registers within the gap share a block, farther ones do not",
+    )
+    check(
+        plan_blocks(["C10005", "D10200", "H10705", "I10205"])
+        == [(1, 10005, 1), (2, 10200, 1), (3, 10705, 1), (4, 10205, 1)],
+        "each register type is read with its own function",
+    )
+    check(
+        [count for _, _, count in plan_blocks(f"H{a:05}" for a in range(300))]
+        == [125, 125, 50],
+        "word reads are split at 125 registers",
+    )
+    check(plan_blocks(["X00001", "Hfoo"]) == [], "unknown register IDs are skipped")
+
+
+async def async_silent_server() -> tuple[asyncio.Server, int]:
+    """Accept Modbus connections and never answer."""
+
+    async def ignore(reader, writer):
+        try:
+            await reader.read()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(ignore, HOST, 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def async_check_client(session: ClientSession) -> None:
+    """Read, write and fall back against an emulated unit."""
+    unit = AtreaEmulator(EmulatorOptions(model="rd5-cf", warnings=3, alert=True))
+    port = await unit.async_start(HOST)
+    modbus_port = await unit.async_start_modbus(HOST)
+    client = AtreaModbusClient(session, Atrea(HOST, port), modbus_port=modbus_port)
+    try:
+        await client.async_auth("")
+        web_status = dict(await client.async_get_status())
+        requests = unit.stats.requests.get("modbus", 0)
+        status = await client.async_get_status()
+        check(
+            unit.stats.requests.get("modbus", 0) > requests,
+            "the second status read uses Modbus",
+        )
+        check(status == web_status, "Modbus status matches the XML status")
+        check(
+            any(key[0] in "CD" for key in status)
+            and any(key[0] in "HI" for key in status),
+            "both bit and word registers were compared",
+        )
+
+        client.query_plan = frozenset({"H10705", "I10215"})
+        status = await client.async_get_status()
+        check(
+            status == {key: web_status[key] for key in client.query_plan},
+            "only registers in the query plan are kept",
+        )
+        client.query_plan = None
+
+        accepted = await client.async_exec(
+            {"H10708": "00040", "H10709": "00001", "H10710": "00230"}
+        )
+        check(
+            accepted
+            and (unit.status["H10714"], unit.status["H10705"], unit.status["H10706"])
+            == ("40", "1", "230"),
+            "adjacent holding registers are written in one run",
+        )
+        accepted = await client.async_execute_one_shot_command("H10712", 2)
+        check(accepted and unit.status["H10712"] == "2", "a single register write")
+        accepted = await client.async_execute_one_shot_command("C10005", 1)
+        check(
+            accepted and all(unit.status[code] == "0" for code in ALERT_CODES),
+            "a coil write resets the alerts",
+        )
+
+        # A closed port fails right away, the web interface answers instead
+        await unit.async_stop()
+        port = await unit.async_start(HOST, port)
+        requests = unit.stats.requests.get("/config/xml.xml", 0)
+        status = await client.async_get_status()
+        check(
+            bool(status) and unit.stats.requests.get("/config/xml.xml", 0) > requests,
+            "a closed Modbus port falls back to the web interface",
+        )
+        # serve Modbus again so the failures in a row start over
+        client.modbus_port = await unit.async_start_modbus(HOST)
+        status = await client.async_get_status()
+
+        # A port that never answers times out, the web interface answers too
+        server, silent_port = await async_silent_server()
+        client.modbus_port = silent_port
+        await client.async_close()
+        try:
+            for attempt in range(MODBUS_MAX_FAILURES):
+                started = time.monotonic()
+                status = await client.async_get_status()
+                check(
+                    bool(status) and time.monotonic() - started < 2 * MODBUS_TIMEOUT,
+                    f"a silent Modbus port falls back within its timeout ({attempt})",
+                )
+            started = time.monotonic()
+            status = await client.async_get_status()
+            check(
+                bool(status) and time.monotonic() - started < MODBUS_TIMEOUT,
+                "Modbus is paused after repeated failures",
+            )
+            accepted = await client.async_execute_one_shot_command("H10712", 1)
+            check(
+                accepted and unit.status["H10712"] == "1",
+                "commands use the web interface while Modbus is paused",
+            )
+        finally:
+            server.close()
+    finally:
+        await client.async_close()
+        await unit.async_stop()
+
+
+async def async_main() -> None:
+    check_plan_blocks()
+    async with ClientSession() as session:
+        await async_check_client(session)
+
+
+def main() -> None:
+    modbus.MODBUS_TIMEOUT = MODBUS_TIMEOUT
+    asyncio.run(async_main())
+    if failures:
+        print(f"{len(failures)} checks failed.")
+        sys.exit(1)
+    print("All checks passed.")
+
+
+if __name__ == "__main__":
+    main()